@@ -0,0 +1,17 @@
+# Multi-worker production server: the app (and its embedding model, see
+# EMBEDDING_MODEL_PRELOAD) is loaded once in the master and shared with the
+# forked uvicorn workers copy-on-write.
+import os
+
+os.environ.setdefault("EMBEDDING_MODEL_PRELOAD", "true")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:80")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+
+if workers > 1:
+    # a status polled from any worker must be the one the accepting worker wrote
+    os.environ.setdefault("INGESTION_STATUS_BACKEND", "redis")
+    # ingestion in one worker must invalidate the search results cached by all
+    os.environ.setdefault("RESULT_CACHE_BACKEND", "redis")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from typing import Optional
+
+import numpy as np
+
+from src import config
+from src.ai_executor import EmbeddingExecutor, embedding_executor
+
+logger = logging.getLogger('uvicorn')
+
+
+class EmbeddingBatcher:
+    """
+    Coalesce concurrent single-text embedding requests into batched forward passes.
+
+    Texts submitted within `window_ms` of the first pending one (or until
+    `max_batch_size` texts are pending) are encoded with one
+    EmbeddingExecutor.embed_batch call, and each caller gets its own vector back.
+    """
+
+    def __init__(self, executor: EmbeddingExecutor, window_ms: float, max_batch_size: int):
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending: list[tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._batches = 0
+        self._texts = 0
+        self._max_batch = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "batches": self._batches,
+            "texts": self._texts,
+            "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0,
+            "max_batch_size": self._max_batch,
+            "avg_wait_ms": round(self._wait_total / self._texts * 1000, 3) if self._texts else 0,
+            "max_wait_ms": round(self._wait_max * 1000, 3),
+        }
+
+    async def embed(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, loop.time()))
+
+        if len(self._pending) >= self.max_batch_size or self.window <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run_batch(batch))
+        # hold a reference until done, the event loop only keeps weak ones
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future, float]]):
+        now = asyncio.get_running_loop().time()
+        waits = [now - enqueued_at for _, _, enqueued_at in batch]
+        self._batches += 1
+        self._texts += len(batch)
+        self._max_batch = max(self._max_batch, len(batch))
+        self._wait_total += sum(waits)
+        self._wait_max = max(self._wait_max, *waits)
+
+        # identical texts in the same window share one slot in the batch
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        logger.debug(f"EmbeddingBatcher: encoding {len(texts)} texts for {len(batch)} callers")
+        try:
+            vectors = await self.executor.embed_batch(texts, block=False)
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        by_text = dict(zip(texts, vectors))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+
+embedding_batcher = EmbeddingBatcher(
+    embedding_executor,
+    window_ms=config.EMBEDDING_BATCH_WINDOW_MS,
+    max_batch_size=config.EMBEDDING_BATCH_MAX_SIZE,
+)
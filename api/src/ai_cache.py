@@ -0,0 +1,52 @@
+import logging
+import pathlib
+
+import numpy as np
+
+from src import config
+from src.ai_batcher import embedding_batcher
+from src.ai_executor import embedding_executor
+from src.cache import LRUCache
+
+logger = logging.getLogger('uvicorn')
+
+query_embedding_cache = LRUCache(
+    maxsize=config.EMBEDDING_CACHE_SIZE, ttl=config.EMBEDDING_CACHE_TTL
+)
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and collapse whitespace, the model is uncased anyway"""
+    return " ".join(text.lower().split())
+
+
+async def embed_query(text: str) -> np.ndarray:
+    """Embed a semantic search query, served from query_embedding_cache when possible"""
+    query = normalize_query(text)
+    embedding = query_embedding_cache.get(query)
+    if embedding is None:
+        embedding = await embedding_batcher.embed(query)
+        # shared between requests from now on
+        embedding.setflags(write=False)
+        query_embedding_cache.set(query, embedding)
+    return embedding
+
+
+async def prewarm(queries: list[str]):
+    """Embed popular queries in one batch and store them in the cache"""
+    queries = list(dict.fromkeys(normalize_query(q) for q in queries if q.strip()))
+    if not queries:
+        return
+    embeddings = await embedding_executor.embed_batch(
+        queries, batch_size=config.EMBEDDING_BATCH_SIZE
+    )
+    for query, embedding in zip(queries, embeddings):
+        embedding.setflags(write=False)
+        query_embedding_cache.set(query, embedding)
+    logger.debug(f"ai_cache: pre-warmed {len(queries)} query embeddings")
+
+
+async def prewarm_from_file(path: str | pathlib.Path):
+    """Pre-warm from a text file holding one semantic query per line"""
+    with pathlib.Path(path).open(encoding="utf-8") as f:
+        await prewarm(f.read().splitlines())
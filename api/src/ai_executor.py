@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from src import ai_model, config
+
+logger = logging.getLogger('uvicorn')
+
+
+class EmbeddingQueueFull(Exception):
+    """Raised when the embedding executor already has queue_limit calls waiting"""
+
+
+class EmbeddingExecutor:
+    """
+    Run SentenceTransformer inference on a bounded thread or process pool and
+    expose it as awaitables, so encoding never blocks the event loop.
+
+    At most `pool_size` calls run at once and up to `queue_limit` more may wait
+    for a free worker. Query embeddings beyond that fail fast with
+    EmbeddingQueueFull instead of piling up behind a heavy ingestion, while
+    backfill batches (block=True) wait for a free slot.
+    """
+
+    def __init__(self, pool_size: int, queue_limit: int, kind: str = "thread"):
+        self.pool_size = pool_size
+        self.queue_limit = queue_limit
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def start(self):
+        if self._executor is not None:
+            return
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.pool_size)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="embedding"
+            )
+        self._slots = asyncio.Semaphore(self.pool_size + self.queue_limit)
+        logger.debug(
+            f"EmbeddingExecutor: started {self.kind} pool "
+            f"(pool_size={self.pool_size}, queue_limit={self.queue_limit})"
+        )
+
+    def shutdown(self):
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._slots = None
+
+    async def _run(self, fn: Callable[..., Any], *args, block: bool = False) -> Any:
+        self.start()
+        if not block and self._slots.locked():
+            raise EmbeddingQueueFull(
+                f"{self.pool_size + self.queue_limit} embedding calls already in flight"
+            )
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def warmup(self):
+        await self._run(ai_model.warmup, block=True)
+
+    async def embed_batch(
+        self, texts: list[str], batch_size: int = 32, block: bool = True
+    ) -> list[np.ndarray]:
+        return await self._run(ai_model.embed_batch, texts, batch_size, block=block)
+
+
+embedding_executor = EmbeddingExecutor(
+    pool_size=config.EMBEDDING_POOL_SIZE,
+    queue_limit=config.EMBEDDING_QUEUE_LIMIT,
+    kind=config.EMBEDDING_EXECUTOR,
+)
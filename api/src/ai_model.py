@@ -1,11 +1,53 @@
-from sentence_transformers import SentenceTransformer
+import gc
+import logging
+import threading
 
+import numpy as np
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+from src import config
 
+logger = logging.getLogger('uvicorn')
 
-def embed(text: str) -> list[float]:
-    embedding = model.encode(text)
-    # convert numpy array to float array
-    # TODO: should be an asyncpg proper syntax
-    return embedding.astype(float).tolist()
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Load the SentenceTransformer on first use, once per process"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                # importing sentence_transformers pulls in torch, defer it as well
+                from sentence_transformers import SentenceTransformer
+
+                logger.debug(f"ai_model: loading {config.EMBEDDING_MODEL_NAME}")
+                _model = SentenceTransformer(config.EMBEDDING_MODEL_NAME)
+    return _model
+
+
+def warmup():
+    """Load the model and run one throwaway encode to initialize its kernels"""
+    get_model().encode("warmup")
+
+
+def preload():
+    """
+    Load the model in a parent process before workers are forked (gunicorn --preload),
+    so the weights are shared copy-on-write instead of loaded once per worker.
+    gc.freeze() moves everything allocated so far out of the collector's reach,
+    otherwise the first collection in each worker touches and copies those pages.
+    No inference runs here: it would start torch's thread pools in the parent,
+    and forked workers inheriting them can hang. Each worker warms up in lifespan.
+    """
+    get_model()
+    gc.freeze()
+
+
+def embed_batch(texts: list[str], batch_size: int = 32) -> list[np.ndarray]:
+    """
+    Embed many texts with a single batched `model.encode` call, as float32
+    vectors passed as is to the binary pgvector codec
+    """
+    embeddings = get_model().encode(texts, batch_size=batch_size)
+    return list(embeddings.astype(np.float32, copy=False))
@@ -0,0 +1,171 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+logger = logging.getLogger('uvicorn')
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with an optional per-entry TTL (seconds).
+    A ttl of 0 or None keeps entries until they are evicted by size.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is not None:
+            expires_at, value = item
+            if not expires_at or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0,
+        }
+
+
+class MemoryCacheBackend:
+    """
+    Async cache interface over an in-process LRUCache, with a generation counter
+    that callers fold into their keys so bumping it invalidates every entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(maxsize, ttl)
+        self._generation = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any):
+        self._cache.set(key, value)
+
+    async def get_generation(self) -> int:
+        return self._generation
+
+    async def bump_generation(self):
+        self._generation += 1
+        # old generation entries can never be hit again
+        self._cache.clear()
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "generation": self._generation, **self._cache.stats()}
+
+
+class RedisCacheBackend:
+    """
+    Same interface as MemoryCacheBackend, backed by Redis so entries and the
+    generation counter are shared by every API worker. Values are stored as JSON.
+
+    Redis errors degrade like a cache should: reads are misses, writes are
+    skipped, and an unknown generation (None) tells callers not to cache at all.
+    """
+
+    def __init__(self, url: str, prefix: str, ttl: Optional[float] = None):
+        # only needed when the redis backend is configured
+        import redis.asyncio as redis
+        from redis.exceptions import RedisError
+
+        self._redis = redis.from_url(url)
+        self._errors = RedisError
+        self.prefix = prefix
+        self.ttl = int(ttl) if ttl else None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _failed(self, operation: str, exc: Exception):
+        self.errors += 1
+        logger.warning(f"RedisCacheBackend: {operation} {self.prefix}* failed - {exc}")
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self._redis.get(self.prefix + key)
+        except self._errors as exc:
+            self._failed("get", exc)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any):
+        try:
+            await self._redis.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+        except self._errors as exc:
+            self._failed("set", exc)
+
+    async def get_generation(self) -> Optional[int]:
+        try:
+            return int(await self._redis.get(self.prefix + "generation") or 0)
+        except self._errors as exc:
+            self._failed("get_generation", exc)
+            return None
+
+    async def bump_generation(self):
+        try:
+            await self._redis.incr(self.prefix + "generation")
+        except self._errors as exc:
+            # entries of the current generation stay visible until their TTL
+            self._failed("bump_generation", exc)
+
+    async def close(self):
+        await self._redis.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0,
+        }
+
+
+def make_cache_backend(
+    backend: str, maxsize: int, ttl: Optional[float], redis_url: str, prefix: str
+) -> Optional[MemoryCacheBackend | RedisCacheBackend]:
+    """Build the backend named by config ("memory", "redis"), None disables caching"""
+    if backend == "memory":
+        return MemoryCacheBackend(maxsize, ttl)
+    if backend == "redis":
+        return RedisCacheBackend(redis_url, prefix, ttl)
+    return None
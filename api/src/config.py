@@ -11,3 +11,96 @@ project_root = pathlib.Path(__file__).parent.parent.resolve()
 UVICORN_LOGGING_LEVEL = "DEBUG"  # 'INFO' / 'WARNING' / 'ERROR' / 'DEBUG'
 SQLITE_DB_FILE = project_root.parent / "data" / "linkedai.db"
 ENDPOINT_NLU = os.environ.get("ENDPOINT_NLU", "http://localhost:5005/model/parse")
+
+# Pooled NLU client: timeouts in seconds, at most NLU_MAX_CONNECTIONS parses in flight
+NLU_CONNECT_TIMEOUT = float(os.environ.get("NLU_CONNECT_TIMEOUT", 2.0))
+NLU_READ_TIMEOUT = float(os.environ.get("NLU_READ_TIMEOUT", 10.0))
+NLU_POOL_TIMEOUT = float(os.environ.get("NLU_POOL_TIMEOUT", 5.0))
+NLU_MAX_CONNECTIONS = int(os.environ.get("NLU_MAX_CONNECTIONS", 20))
+NLU_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("NLU_MAX_KEEPALIVE_CONNECTIONS", 10))
+
+# NLU parse cache: "memory", "redis" or "" to disable. Entries are keyed on the
+# model id from Rasa's /status endpoint, polled every NLU_MODEL_CHECK_INTERVAL seconds
+NLU_CACHE_BACKEND = os.environ.get("NLU_CACHE_BACKEND", "memory")
+NLU_CACHE_SIZE = int(os.environ.get("NLU_CACHE_SIZE", 4096))
+NLU_CACHE_TTL = float(os.environ.get("NLU_CACHE_TTL", 24 * 3600))
+NLU_STATUS_ENDPOINT = os.environ.get(
+    "NLU_STATUS_ENDPOINT", ENDPOINT_NLU.removesuffix("/model/parse") + "/status"
+)
+NLU_MODEL_CHECK_INTERVAL = float(os.environ.get("NLU_MODEL_CHECK_INTERVAL", 60))
+
+# Embedding model, loaded lazily on first use or by warmup in lifespan.
+# PRELOAD loads it when src.main is imported, e.g. in a `gunicorn --preload`
+# master so forked workers share the weights copy-on-write.
+EMBEDDING_MODEL_NAME = os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_MODEL_WARMUP = os.environ.get("EMBEDDING_MODEL_WARMUP", "true").lower() == "true"
+EMBEDDING_MODEL_PRELOAD = os.environ.get("EMBEDDING_MODEL_PRELOAD", "false").lower() == "true"
+
+# Embedding backfill: number of jobs fetched, encoded and written per chunk
+EMBEDDING_CHUNK_SIZE = int(os.environ.get("EMBEDDING_CHUNK_SIZE", 64))
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))
+
+# Embedding executor: "thread" or "process" pool running model inference
+EMBEDDING_EXECUTOR = os.environ.get("EMBEDDING_EXECUTOR", "thread")
+EMBEDDING_POOL_SIZE = int(os.environ.get("EMBEDDING_POOL_SIZE", 2))
+EMBEDDING_QUEUE_LIMIT = int(os.environ.get("EMBEDDING_QUEUE_LIMIT", 32))
+
+# Query embedding coalescer: collect texts for up to WINDOW_MS or MAX_SIZE texts
+EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", 5))
+EMBEDDING_BATCH_MAX_SIZE = int(os.environ.get("EMBEDDING_BATCH_MAX_SIZE", 32))
+
+# Semantic query embedding cache (TTL in seconds, 0 = no expiry)
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 1024))
+EMBEDDING_CACHE_TTL = float(os.environ.get("EMBEDDING_CACHE_TTL", 0))
+# Optional text file with one popular semantic query per line, embedded at startup
+EMBEDDING_CACHE_PREWARM_FILE = os.environ.get("EMBEDDING_CACHE_PREWARM_FILE", "")
+
+# Background ingestion: POST /jobs returns 202 and a worker task writes and embeds
+INGESTION_BACKGROUND = os.environ.get("INGESTION_BACKGROUND", "false").lower() == "true"
+INGESTION_QUEUE_SIZE = int(os.environ.get("INGESTION_QUEUE_SIZE", 16))
+# Ingestion statuses: "memory" (only the accepting worker can report them) or
+# "redis" (shared by every worker, see gunicorn.conf.py), kept for INGESTION_STATUS_TTL seconds
+INGESTION_STATUS_BACKEND = os.environ.get("INGESTION_STATUS_BACKEND", "memory")
+INGESTION_HISTORY_SIZE = int(os.environ.get("INGESTION_HISTORY_SIZE", 256))
+INGESTION_STATUS_TTL = float(os.environ.get("INGESTION_STATUS_TTL", 24 * 3600))
+
+# Streaming NDJSON ingestion: jobs written per batch, rejected lines reported
+NDJSON_BATCH_SIZE = int(os.environ.get("NDJSON_BATCH_SIZE", 500))
+NDJSON_MAX_ERRORS = int(os.environ.get("NDJSON_MAX_ERRORS", 100))
+
+# Hybrid search: top-K vector and top-K trigram candidates are reranked
+HYBRID_CANDIDATES_K = int(os.environ.get("HYBRID_CANDIDATES_K", 200))
+# Hybrid search SQL text memoized per query shape (entity counts, semantic, strict, paged)
+HYBRID_TEMPLATE_CACHE_SIZE = int(os.environ.get("HYBRID_TEMPLATE_CACHE_SIZE", 256))
+# Strict mode: location / workplace type entities filter (pg_trgm `<%`) the top-K candidates
+HYBRID_STRICT_FILTERS = os.environ.get("HYBRID_STRICT_FILTERS", "false").lower() == "true"
+# Strict mode: at most this many filtered jobs are ranked by exact vector distance
+HYBRID_STRICT_FILTER_CAP = int(os.environ.get("HYBRID_STRICT_FILTER_CAP", 5000))
+
+# Hybrid search rerank weights, each can be overridden per request
+RERANK_WEIGHT_SEMANTIC = float(os.environ.get("RERANK_WEIGHT_SEMANTIC", 1.0))
+RERANK_WEIGHT_JOB_TITLE = float(os.environ.get("RERANK_WEIGHT_JOB_TITLE", 1.0))
+RERANK_WEIGHT_JOB_LOCATION = float(os.environ.get("RERANK_WEIGHT_JOB_LOCATION", 1.1))
+RERANK_WEIGHT_WORKPLACE_TYPE = float(os.environ.get("RERANK_WEIGHT_WORKPLACE_TYPE", 1.0))
+
+# asyncpg prepared statements cached per pooled connection, keyed by SQL text
+PG_STATEMENT_CACHE_SIZE = int(os.environ.get("PG_STATEMENT_CACHE_SIZE", 256))
+# Hybrid search statements prepared explicitly per pooled connection, one per query shape
+PG_PREPARED_STATEMENTS_SIZE = int(os.environ.get("PG_PREPARED_STATEMENTS_SIZE", 128))
+
+# Redis instance shared by the cache backends
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/1")
+
+# /jobs_entities result cache: "memory", "redis" or "" to disable. With "memory"
+# an ingestion only invalidates its own worker's entries, others serve results
+# up to RESULT_CACHE_TTL old, so multi-worker servers use "redis" (gunicorn.conf.py)
+RESULT_CACHE_BACKEND = os.environ.get("RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 512))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 3600))
+
+# Keyset pagination of /jobs, /jobs_entities and /companies
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", 30))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", 200))
+
+# Apply pending schema migrations (src/migrations.py) when the API starts
+MIGRATE_ON_STARTUP = os.environ.get("MIGRATE_ON_STARTUP", "false").lower() == "true"
@@ -1,12 +1,47 @@
+import struct
+from collections import OrderedDict
+
 import asyncpg
+import numpy as np
 from asyncpg import Pool
 from dotenv import load_dotenv
 import os
 
+from src import config
+
+# pgvector binary wire format: uint16 dimensions, uint16 unused, float32[dim] (big-endian)
+_VECTOR_HEADER = struct.Struct(">HH")
+_VECTOR_DTYPE = np.dtype(">f4")
+
+
+def encode_vector(value) -> bytes:
+    vector = np.asarray(value, dtype=_VECTOR_DTYPE)
+    return _VECTOR_HEADER.pack(vector.shape[0], 0) + vector.tobytes()
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    dim, _ = _VECTOR_HEADER.unpack_from(data)
+    vector = np.frombuffer(data, dtype=_VECTOR_DTYPE, count=dim, offset=_VECTOR_HEADER.size)
+    return vector.astype(np.float32)
+
+
+async def register_vector(connection: asyncpg.Connection):
+    """Send and receive pgvector `vector` values as binary float32 NumPy arrays"""
+    await connection.set_type_codec(
+        "vector",
+        encoder=encode_vector,
+        decoder=decode_vector,
+        format="binary",
+    )
+
 
 class PostgresDB:
     def __init__(self):
         self.pool: Pool = None
+        # server pid -> {SQL text: PreparedStatement}, one map per pooled connection
+        self._prepared: dict[int, OrderedDict] = {}
+        self.prepared_hits = 0
+        self.prepared_misses = 0
         self.load_env()
         self.dsn = self.build_dsn()
 
@@ -23,7 +58,18 @@ class PostgresDB:
         return f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 
     async def connect(self):
-        self.pool = await asyncpg.create_pool(dsn=self.dsn)
+        self.pool = await asyncpg.create_pool(
+            dsn=self.dsn,
+            init=self._init_connection,
+            statement_cache_size=config.PG_STATEMENT_CACHE_SIZE,
+        )
+
+    async def _init_connection(self, connection: asyncpg.Connection):
+        await register_vector(connection)
+        pid = connection.get_server_pid()
+        self._prepared[pid] = OrderedDict()
+        # statements die with their connection
+        connection.add_termination_listener(lambda _: self._prepared.pop(pid, None))
 
     async def disconnect(self):
         await self.pool.close()
@@ -40,6 +86,41 @@ class PostgresDB:
                 for query, *args in queries:
                     await connection.execute(query, *args)
 
+    async def executemany(self, query: str, args):
+        """Run `query` once per args tuple, as a single atomic batch"""
+        connection: asyncpg.Connection
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.executemany(query, args)
+
+    async def copy_insert(
+        self, table: str, columns: list[str], records, on_conflict: str = ""
+    ) -> int:
+        """
+        Bulk insert `records` (tuples ordered like `columns`) into `table`.
+        Records are COPYed into a temporary staging table and moved over with one
+        set-based INSERT .. SELECT, so `on_conflict` (e.g. "ON CONFLICT DO NOTHING")
+        is applied to the whole batch. Returns the number of inserted rows.
+        """
+        cols = ", ".join(columns)
+        staging = f"staging_{table}"
+        connection: asyncpg.Connection
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                # column types only, no constraints or serial defaults
+                await connection.execute(
+                    f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                    f"SELECT {cols} FROM {table} WITH NO DATA"
+                )
+                await connection.copy_records_to_table(
+                    staging, records=records, columns=columns
+                )
+                result = await connection.execute(
+                    f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {staging} {on_conflict}"
+                )
+        # status is "INSERT 0 <rows>"
+        return int(result.split()[-1])
+
     async def fetchrow(self, query: str, *args) -> asyncpg.Record:
         connection: asyncpg.Connection
         async with self.pool.acquire() as connection:
@@ -51,3 +132,40 @@ class PostgresDB:
         async with self.pool.acquire() as connection:
             result = await connection.fetch(query, *args)
             return result
+
+    async def fetch_prepared(self, query: str, *args) -> list[asyncpg.Record]:
+        """
+        fetch through a statement prepared explicitly on the pooled connection
+        and kept for its lifetime (up to PG_PREPARED_STATEMENTS_SIZE per connection),
+        so a query shape run again is neither parsed nor analyzed again, and the
+        server can switch it to a generic plan. Counted in prepared_stats.
+        """
+        connection: asyncpg.Connection
+        async with self.pool.acquire() as connection:
+            statements = self._prepared.setdefault(connection.get_server_pid(), OrderedDict())
+            statement = statements.get(query)
+            if statement is None:
+                self.prepared_misses += 1
+                statement = await connection.prepare(query)
+                statements[query] = statement
+                if len(statements) > config.PG_PREPARED_STATEMENTS_SIZE:
+                    statements.popitem(last=False)
+            else:
+                self.prepared_hits += 1
+                statements.move_to_end(query)
+            try:
+                return await statement.fetch(*args)
+            except asyncpg.InvalidCachedStatementError:
+                # the schema changed under the statement (e.g. a migration), prepare it again
+                self.prepared_misses += 1
+                statement = await connection.prepare(query)
+                statements[query] = statement
+                return await statement.fetch(*args)
+
+    def prepared_stats(self) -> dict:
+        return {
+            "hits": self.prepared_hits,
+            "prepares": self.prepared_misses,
+            "connections": len(self._prepared),
+            "statements": sum(len(statements) for statements in self._prepared.values()),
+        }
@@ -1,36 +1,92 @@
+import functools
+import hashlib
+import inspect
 import logging
-from typing import Any
+from typing import Any, Callable, Optional
 
+import asyncpg
+
+from src import config
 from src.db_pg import PostgresDB
-from src.domain import JobPost, NLUEntity
-from src.ai_model import embed
+from src.domain import JobPost, NLUEntity, RerankWeights
+from src.ai_cache import embed_query
+from src.ai_executor import embedding_executor
 
 logger = logging.getLogger('uvicorn')
 
 
 class DBService:
+    # entity types scored by trigram similarity in hybrid search
+    FUZZY_ENTITIES = ('job_title', 'job_location', 'workplace_type')
+    # entity types that become WHERE predicates in strict hybrid search
+    STRICT_FILTER_ENTITIES = ('job_location', 'workplace_type')
+
     @staticmethod
-    def compile_hybrid_query(entities: list[NLUEntity]) -> tuple[str, list[Any]]:
+    async def compile_hybrid_query(
+        entities: list[NLUEntity],
+        weights: Optional[RerankWeights] = None,
+        strict: bool = False,
+        limit: int = 30,
+        after: Optional[tuple[float, int]] = None,
+        semantic_text: Optional[str] = None,
+    ) -> tuple[str, list[Any]]:
         """
         Take each given entity and use its value for either semantic search
         (using pg_vector cosine similarity <=>) or fuzzy keyword search (using SIMILARITY).
-        jobs_rerank_score accepts 4 arguments, we use 0 for missing entities.
+        The rerank score is a plain SQL expression summing one weighted term per
+        entity type that is present, weights are bound as parameters so tuning them
+        needs neither a migration nor a new statement.
+
+        Scoring runs in two stages so the ivfflat and trigram indexes do the heavy
+        lifting: first the top HYBRID_CANDIDATES_K jobs by vector distance and the
+        top HYBRID_CANDIDATES_K trigram word matches (`<%` operator, ranked by
+        word_similarity) are collected, then the score is computed only for their union.
+
+        With `strict`, job_location and workplace_type entities become hard
+        trigram word filters (`<%`, each entity type must match one of its values)
+        applied inside both top-K stages, so only jobs passing them are candidates.
+        The vector stage then orders a `filtered` set, collected through the
+        trigram indexes, by exact distance: filtering after an ivfflat scan would
+        only see the rows of the probed lists. The set holds at most
+        HYBRID_STRICT_FILTER_CAP jobs, beyond that an arbitrary subset of the
+        matching jobs is vector ranked. See search_jobs for the fallback when
+        nothing passes.
 
         i.e resulting SQL:
 
-            SELECT job_id, job_post_id, job_title, job_location, workplace_type,
-                posted_date, posted_timestamp, contact, company_id, companies.company_name,
-                jobs_rerank_score(
-                    (1 - (job_description_vector <=> %s)),
-                    GREATEST(SIMILARITY(lower(job_title), lower(%s))),
-                    GREATEST(SIMILARITY(lower(job_location), lower(%s)), SIMILARITY(lower(job_location), lower(%s))),
-                    GREATEST(SIMILARITY(lower(workplace_type), lower(%s)))
-                ) as rerank_score
-            FROM jobs
-            INNER JOIN companies ON jobs.company_id = companies.company_id
-            ORDER BY rerank_score DESC
-            LIMIT 30;
+            WITH candidates AS (
+                (SELECT job_id FROM jobs
+                 ORDER BY job_description_vector <=> $1 LIMIT 200)
+                UNION
+                (SELECT job_id FROM jobs
+                 WHERE $3 <% job_title OR $5 <% job_location OR $6 <% job_location
+                 ORDER BY GREATEST(word_similarity($3, job_title), word_similarity($5, job_location),
+                                   word_similarity($6, job_location)) DESC
+                 LIMIT 200)
+            )
+            SELECT * FROM (
+                SELECT job_id, job_post_id, job_title, job_location, workplace_type,
+                    posted_date, posted_timestamp, contact, company_id, companies.company_name,
+                    (
+                        $2::float8 * COALESCE(1 - (job_description_vector <=> $1), 0)
+                        + $4::float8 * COALESCE(GREATEST(SIMILARITY(lower(job_title), lower($3))), 0)
+                        + $7::float8 * COALESCE(GREATEST(SIMILARITY(lower(job_location), lower($5)), SIMILARITY(lower(job_location), lower($6))), 0)
+                    ) as rerank_score
+                FROM candidates
+                INNER JOIN jobs USING (job_id)
+                INNER JOIN companies ON jobs.company_id = companies.company_id
+            ) ranked
+            WHERE rerank_score < $8 OR (rerank_score = $8 AND job_id > $9)  -- next pages only
+            ORDER BY rerank_score DESC, job_id
+            LIMIT $10;
+
+        Results are paged by keyset on (rerank_score, job_id): `after` is the
+        last row of the previous page. Pages only reach into the candidate set.
+
+        `semantic_text` replaces the job_title / skills semantic query, e.g. with
+        the user's full search text.
         """
+        weights = weights or RerankWeights()
 
         entity_dict = {}
         for entity in entities:
@@ -39,7 +95,7 @@ class DBService:
             else:
                 entity_dict[entity.entity] = [entity.value]
 
-        rerank_items = []
+        # params are appended in the order hybrid_query_template numbers them
         params = []
 
         ### semantic search entities
@@ -50,103 +106,278 @@ class DBService:
         if 'skills' in entity_dict:
             skills_values = entity_dict['skills']
             semantic_query += f"[Skills: {', '.join(skills_values)}] "
+        if semantic_text:
+            semantic_query = semantic_text
 
         if semantic_query:
-            semantic_query_embedded = embed(semantic_query.strip())
-            rerank_items.append("(1 - (job_description_vector <=> %s))")
-            params.append(f'{semantic_query_embedded}')
-        else:
-            rerank_items.append('0')
+            params.append(await embed_query(semantic_query))
+            params.append(weights.semantic)
 
         ## Fuzzy similarity entities
-        for entity_type in ['job_title', 'job_location', 'workplace_type']:
-            values = entity_dict.get(entity_type)
+        value_counts = []
+        for entity_type in DBService.FUZZY_ENTITIES:
+            values = entity_dict.get(entity_type, [])
+            value_counts.append(len(values))
             if values:
-                similarities = [f'SIMILARITY(lower({entity_type}), lower(%s))'] * len(values)
-                rerank_items.append('GREATEST(' + ', '.join(similarities) + ')')
                 params.extend(values)
-            else:
-                rerank_items.append('0')
-
-        sql = """
-        SELECT job_id, job_post_id, job_title, job_location, workplace_type,
-        posted_date, posted_timestamp, contact, jobs.company_id, companies.company_name,
-        jobs_rerank_score(
-            {}
-        ) as rerank_score
-        FROM jobs
-        INNER JOIN companies ON jobs.company_id = companies.company_id
-        ORDER BY rerank_score DESC
-        LIMIT 30;
-        """.format(',\n'.join(rerank_items))
+                params.append(getattr(weights, entity_type))
+
+        if after is not None:
+            params.extend(after)
+        params.append(limit)
 
-        # replace %s with $1, $2..
-        sql = sql.replace("%s", "${}").format(*tuple(range(1, sql.count("%s") + 1))).strip()
+        strict = strict and any(entity_dict.get(t) for t in DBService.STRICT_FILTER_ENTITIES)
+        sql = DBService.hybrid_query_template(
+            bool(semantic_query), tuple(value_counts), strict, after is not None)
 
         return (sql, params)
 
 
     @staticmethod
-    async def save_companies_to_postgres(db: PostgresDB, job_posts: list[JobPost]):
-        # Insert data into the companies table
+    @functools.lru_cache(maxsize=config.HYBRID_TEMPLATE_CACHE_SIZE)
+    def hybrid_query_template(
+        semantic: bool, value_counts: tuple[int, ...], strict: bool, paged: bool
+    ) -> str:
+        """
+        Build the hybrid search SQL for one query shape: whether there is a
+        semantic term, how many values each FUZZY_ENTITIES type has, strict
+        mode and whether it continues after a cursor. The text only depends on
+        the shape, so it is built once, and search_jobs runs it through
+        PostgresDB.fetch_prepared, which prepares each shape once per pooled connection.
+        """
+        rerank_items = []
+        candidate_queries = []
+        placeholder_count = 0
+
+        def _placeholder() -> str:
+            nonlocal placeholder_count
+            placeholder_count += 1
+            return f"${placeholder_count}"
+
+        candidates_k = config.HYBRID_CANDIDATES_K
+
+        if semantic:
+            vector = _placeholder()
+            weight = _placeholder()
+            rerank_items.append(f"{weight}::float8 * COALESCE(1 - (job_description_vector <=> {vector}), 0)")
+
+        trigram_matches = []
+        trigram_similarities = []
+        strict_filters = []
+        for entity_type, count in zip(DBService.FUZZY_ENTITIES, value_counts):
+            if count:
+                placeholders = [_placeholder() for _ in range(count)]
+                similarities = [f'SIMILARITY(lower({entity_type}), lower({p}))' for p in placeholders]
+                weight = _placeholder()
+                rerank_items.append(f"{weight}::float8 * COALESCE(GREATEST(" + ', '.join(similarities) + '), 0)')
+                # word similarity (`<%`): a short value like "haifa" matches inside
+                # "Haifa, Haifa District, Israel", where whole-string `%` falls
+                # under the threshold. gin_trgm_ops indexes serve both operators
+                trigram_matches.extend(f'{p} <% {entity_type}' for p in placeholders)
+                trigram_similarities.extend(f'word_similarity({p}, {entity_type})' for p in placeholders)
+                if entity_type in DBService.STRICT_FILTER_ENTITIES:
+                    matches = [f'{p} <% {entity_type}' for p in placeholders]
+                    strict_filters.append('(' + ' OR '.join(matches) + ')')
+
+        # strict filters apply inside both top-K stages, so a broad value like
+        # "remote" never makes every matching job a candidate
+        strict_where = ' AND '.join(strict_filters) if strict else ''
+
+        ctes = []
+        if semantic:
+            vector_source = "jobs"
+            if strict_where:
+                # filter first, the ivfflat index would apply the WHERE after its approximate scan
+                ctes.append(
+                    f"filtered AS MATERIALIZED (SELECT job_id, job_description_vector FROM jobs"
+                    f" WHERE {strict_where} LIMIT {config.HYBRID_STRICT_FILTER_CAP})"
+                )
+                vector_source = "filtered"
+            candidate_queries.append(
+                f"(SELECT job_id FROM {vector_source}"
+                f" ORDER BY job_description_vector <=> {vector} LIMIT {candidates_k})"
+            )
+
+        if trigram_matches:
+            # every strict filter is one of the trigram matches, so it implies their OR
+            candidate_queries.append(
+                f"(SELECT job_id FROM jobs"
+                f" WHERE {strict_where or ' OR '.join(trigram_matches)}"
+                f" ORDER BY GREATEST({', '.join(trigram_similarities)}) DESC"
+                f" LIMIT {candidates_k})"
+            )
+
+        if candidate_queries:
+            ctes.append("candidates AS (\n{}\n)".format('\nUNION\n'.join(candidate_queries)))
+            candidates = "WITH " + ",\n".join(ctes)
+            source = "candidates INNER JOIN jobs USING (job_id)"
+        else:
+            # nothing to rank by, every score is 0
+            candidates = ""
+            source = "jobs"
+
+        after = ""
+        if paged:
+            score, job_id = _placeholder(), _placeholder()
+            after = f"WHERE rerank_score < {score} OR (rerank_score = {score} AND job_id > {job_id})"
+
+        return """
+        {}
+        SELECT * FROM (
+            SELECT job_id, job_post_id, job_title, job_location, workplace_type,
+            posted_date, posted_timestamp, contact, jobs.company_id, companies.company_name,
+            (
+                {}
+            ) as rerank_score
+            FROM {}
+            INNER JOIN companies ON jobs.company_id = companies.company_id
+        ) ranked
+        {}
+        ORDER BY rerank_score DESC, job_id
+        LIMIT {};
+        """.format(candidates, '\n+ '.join(rerank_items) or '0::float8', source,
+                   after, _placeholder()).strip()
+
+
+    @staticmethod
+    async def search_jobs(
+        db: PostgresDB,
+        entities: list[NLUEntity],
+        weights: Optional[RerankWeights] = None,
+        strict: bool = False,
+        limit: int = 30,
+        after: Optional[tuple[float, int]] = None,
+        semantic_text: Optional[str] = None,
+    ) -> tuple[list[asyncpg.Record], bool]:
+        """
+        Run the hybrid search query. In strict mode, fall back to soft scoring
+        when the location / workplace type filters leave no jobs on the first
+        page. Returns the rows and whether strict filtering was kept, later
+        pages must be requested in the same mode.
+        """
+        sql, params = await DBService.compile_hybrid_query(
+            entities, weights, strict, limit, after, semantic_text)
+        rows = await db.fetch_prepared(sql, *params)
+        if rows or not strict or after is not None:
+            return rows, strict
+
+        logger.debug("DBService: strict filters matched no jobs, falling back to soft scoring")
+        sql, params = await DBService.compile_hybrid_query(
+            entities, weights, False, limit, after, semantic_text)
+        return await db.fetch_prepared(sql, *params), False
+
+
+    @staticmethod
+    async def save_companies_to_postgres(db: PostgresDB, job_posts: list[JobPost]) -> dict[str, int]:
+        """
+        Upsert the batch's distinct companies and return a company_name -> company_id
+        map for them, new and existing alike, in one round trip.
+        """
         companies = {}
         for job_post in job_posts:
             companies[job_post.company_name] = job_post.company_description
 
-        queries = []
-        for company_name, company_description in companies.items():
-            logger.debug("DBService: Inserting company {}".format(company_name))
-            company_query = """
-                INSERT INTO companies
-                (company_name, company_description)
-                VALUES ($1, $2)
-                ON CONFLICT ON CONSTRAINT companies_company_name_key DO NOTHING
+        logger.debug(f"DBService: Upserting {len(companies)} companies")
+        # DO UPDATE (a no-op on the name, descriptions are kept) makes RETURNING
+        # yield existing rows too, including ones another transaction inserted
+        # concurrently, which DO NOTHING plus a snapshot SELECT would miss.
+        # Sorted names lock rows in the same order across concurrent batches.
+        names = sorted(companies)
+        rows = await db.fetch(
             """
-            queries.append((company_query, company_name, company_description))
+            INSERT INTO companies (company_name, company_description)
+            SELECT * FROM unnest($1::text[], $2::text[]) AS b(company_name, company_description)
+            ON CONFLICT ON CONSTRAINT companies_company_name_key
+            DO UPDATE SET company_name = EXCLUDED.company_name
+            RETURNING company_id, company_name
+            """,
+            names,
+            [companies[name] for name in names],
+        )
+        return {row['company_name']: row['company_id'] for row in rows}
 
-        await db.execute_transaction(queries)
+
+    @staticmethod
+    def job_content_hash(job_post: JobPost) -> str:
+        """
+        sha256 over the fields that feed search and embeddings. Matches the SQL
+        backfill in sql_docs.md:
+        encode(sha256(convert_to(concat_ws(chr(31), coalesce(..), ..), 'UTF8')), 'hex')
+        """
+        fields = (job_post.job_title, job_post.job_location,
+                  job_post.workplace_type, job_post.job_description)
+        content = "\x1f".join(field or "" for field in fields)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
     @staticmethod
-    async def save_jobs_to_postgres(db: PostgresDB, job_posts: list[JobPost]):
-        """ Insert data into the jobs table """
+    async def save_jobs_to_postgres(
+        db: PostgresDB, job_posts: list[JobPost], company_ids: dict[str, int]
+    ) -> int:
+        """
+        Bulk upsert data into the jobs table, returns the number of new or changed rows.
 
-        # first, get companies
-        companies = await db.fetch("SELECT company_id, company_name FROM companies")
+        Existing jobs are only rewritten when their content_hash differs, in which
+        case job_description_vector is cleared so the backfill re-embeds them.
+        Unchanged re-scrapes are skipped by the ON CONFLICT .. WHERE clause.
+        """
 
-        queries = []
+        # one record per job_post_id, an upsert can't touch the same row twice
+        records = {}
         for job_post in job_posts:
-
-            # try to find company_id from job_post.company_name
-            matching_company = next((company for company in companies if company["company_name"] == job_post.company_name), None)
-            if matching_company:
-                company_id = matching_company['company_id']
-            else:
+            company_id = company_ids.get(job_post.company_name)
+            if company_id is None:
+                logger.warning(f"DBService: Skipping job {job_post.job_post_id}, unknown company {job_post.company_name}")
                 continue
 
-            job_query = """
-                INSERT INTO jobs (
-                    job_post_id, job_title, job_location, workplace_type,
-                    posted_date, posted_timestamp, job_description, company_id,
-                    contact)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                ON CONFLICT ON CONSTRAINT jobs_job_post_id_key DO NOTHING
-            """
-
-            logger.debug("DBService: Inserting job %s", job_post.job_title)
-
-            queries.append((job_query,
-                            job_post.job_post_id, job_post.job_title,
-                            job_post.job_location, job_post.workplace_type,
-                            job_post.posted_date, job_post.posted_timestamp,
-                            job_post.job_description, company_id,
-                            job_post.contact))
-
-        await db.execute_transaction(queries)
+            records[job_post.job_post_id] = (
+                job_post.job_post_id, job_post.job_title,
+                job_post.job_location, job_post.workplace_type,
+                job_post.posted_date, job_post.posted_timestamp,
+                job_post.job_description, company_id,
+                job_post.contact, DBService.job_content_hash(job_post))
+
+        logger.debug(f"DBService: Upserting {len(records)} jobs")
+        return await db.copy_insert(
+            "jobs",
+            ["job_post_id", "job_title", "job_location", "workplace_type",
+             "posted_date", "posted_timestamp", "job_description", "company_id",
+             "contact", "content_hash"],
+            list(records.values()),
+            on_conflict="""
+            ON CONFLICT ON CONSTRAINT jobs_job_post_id_key DO UPDATE SET
+                job_title = EXCLUDED.job_title,
+                job_location = EXCLUDED.job_location,
+                workplace_type = EXCLUDED.workplace_type,
+                posted_date = EXCLUDED.posted_date,
+                posted_timestamp = EXCLUDED.posted_timestamp,
+                job_description = EXCLUDED.job_description,
+                company_id = EXCLUDED.company_id,
+                contact = EXCLUDED.contact,
+                content_hash = EXCLUDED.content_hash,
+                job_description_vector = NULL
+            WHERE jobs.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            """,
+        )
 
 
     @staticmethod
-    async def embed_job_description_vector(db: PostgresDB):
+    async def embed_job_description_vector(
+        db: PostgresDB, on_progress: Optional[Callable[[int], Any]] = None
+    ) -> int:
+        """
+        Backfill job_description_vector for every job where it is NULL.
+
+        Jobs are walked in job_id order, `EMBEDDING_CHUNK_SIZE` rows at a time.
+        Each chunk is encoded with one batched model call and written back with
+        one executemany batch in its own transaction, so memory stays bounded
+        and a failure only loses the chunk in flight. A job whose content_hash
+        changed since its chunk was read is not written, it is NULL again and
+        the next backfill embeds its new text.
+        `on_progress` is called (and awaited if it is a coroutine function) with
+        the chunk size after each chunk is written.
+        Returns the number of embedded jobs.
+        """
 
         def _text_builder(job_title, job_description) -> str:
             r = f"""
@@ -157,30 +388,46 @@ Job Description: {job_description}
 
         logger.debug("DBService: Searching for jobs with job_description_vector..")
 
-        # Retrieve job descriptions and IDs from the database
-        sql = """
-        SELECT job_id, job_title, job_description
+        select_sql = """
+        SELECT job_id, job_title, job_description, content_hash
         FROM jobs
-        WHERE job_description_vector is NULL
+        WHERE job_description_vector is NULL AND job_id > $1
+        ORDER BY job_id
+        LIMIT $2
+        """
+        # a concurrent ingest may change a job while its chunk is being encoded,
+        # the content_hash guard keeps the stale embedding from hiding the new text
+        update_sql = """
+        UPDATE jobs
+        SET job_description_vector = $1
+        WHERE job_id = $2 AND content_hash IS NOT DISTINCT FROM $3
         """
-        jobs = await db.fetch(sql)
-        if not jobs:
-            logger.debug("DBService: Found 0 jobs with missing job_description_vector")
-            return
-
-        # Prepare the data for updating the job_description_vector column
-        queries = []
-        for job_id, job_title, job_description in jobs:
-            # compile document and embed
-            text_to_encode = _text_builder(job_title, job_description)
-            embedding = embed(text_to_encode)
-            # add to query list
-            sql = """
-            UPDATE jobs
-            SET job_description_vector = $1
-            WHERE job_id = $2
-            """
-            queries.append((sql, f'{embedding}', job_id))
 
-        logger.debug(f"DBService: Updating {len(queries)} jobs with embedded job_description_vector")
-        await db.execute_transaction(queries)
+        embedded = 0
+        last_job_id = 0
+        while True:
+            jobs = await db.fetch(select_sql, last_job_id, config.EMBEDDING_CHUNK_SIZE)
+            if not jobs:
+                break
+            last_job_id = jobs[-1]['job_id']
+
+            # compile documents and embed the whole chunk at once
+            texts = [_text_builder(job['job_title'], job['job_description'])
+                     for job in jobs]
+            embeddings = await embedding_executor.embed_batch(
+                texts, batch_size=config.EMBEDDING_BATCH_SIZE)
+
+            logger.debug(f"DBService: Updating {len(jobs)} jobs with embedded job_description_vector")
+            await db.executemany(update_sql, [
+                (embedding, job['job_id'], job['content_hash'])
+                for job, embedding in zip(jobs, embeddings)
+            ])
+            embedded += len(jobs)
+            if on_progress:
+                progress = on_progress(len(jobs))
+                if inspect.isawaitable(progress):
+                    await progress
+
+        if not embedded:
+            logger.debug("DBService: Found 0 jobs with missing job_description_vector")
+        return embedded
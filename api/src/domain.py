@@ -1,8 +1,11 @@
 import re
-from typing import Optional
+from enum import Enum
+from typing import Optional, Union
 
 from pydantic import BaseModel, constr, validator
 
+from src import config
+
 
 class Company(BaseModel):
     company_name: str
@@ -36,6 +39,24 @@ class JobResponse(JobDB, CompanyDB):
     pass
 
 
+class JobView(str, Enum):
+    full = "full"
+    summary = "summary"
+
+
+class JobSummary(BaseModel):
+    """Compact list entry with what the frontend list view shows, no description"""
+
+    job_id: int
+    job_title: str
+    job_location: str
+    workplace_type: Optional[str]
+    posted_date: str
+    posted_timestamp: Optional[int]
+    company_id: int
+    company_name: str
+
+
 def clean_text(text):
     pattern = r"[?$%^&@!#-]"
     cleaned_text = re.sub(pattern, " ", text)
@@ -65,3 +86,54 @@ class NLUResponse(BaseModel):
 class NLUEntity(BaseModel):
     entity: constr(regex="^(job_title|job_location|workplace_type|skills)$")
     value: str
+
+
+class SearchResponse(BaseModel):
+    """POST /search result: the entities NLU extracted and the ranked jobs"""
+
+    text: str
+    entities: list[NLUEntity]
+    strict: bool
+    jobs: Union[list[JobResponse], list[JobSummary]]
+    # milliseconds spent per stage: nlu, embedding, search and total
+    timings: dict[str, float]
+
+
+class RerankWeights(BaseModel):
+    """Weights of each hybrid search score term, defaults come from config"""
+
+    semantic: float = config.RERANK_WEIGHT_SEMANTIC
+    job_title: float = config.RERANK_WEIGHT_JOB_TITLE
+    job_location: float = config.RERANK_WEIGHT_JOB_LOCATION
+    workplace_type: float = config.RERANK_WEIGHT_WORKPLACE_TYPE
+
+
+class IngestionState(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class IngestionStatus(BaseModel):
+    """Progress of a background POST /jobs ingestion"""
+
+    ingestion_id: str
+    state: IngestionState = IngestionState.queued
+    jobs_received: int
+    companies_resolved: int = 0
+    jobs_written: int = 0
+    jobs_embedded: int = 0
+    failures: list[str] = []
+    created_at: float
+    finished_at: Optional[float] = None
+
+
+class StreamIngestionResult(BaseModel):
+    """Outcome of an NDJSON upload to POST /jobs/ndjson"""
+
+    jobs_received: int = 0
+    jobs_rejected: int = 0
+    jobs_written: int = 0
+    errors: list[str] = []
+    ingestion: Optional[IngestionStatus] = None
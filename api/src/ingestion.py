@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+
+from src import config
+from src.cache import make_cache_backend
+from src.db_pg import PostgresDB
+from src.db_service import DBService
+from src.domain import IngestionState, IngestionStatus, JobPost, StreamIngestionResult
+from src.search_cache import invalidate_search_cache
+
+logger = logging.getLogger('uvicorn')
+
+
+class IngestionQueueFull(Exception):
+    """Raised when `queue_size` ingestions are already waiting to run"""
+
+
+class IngestionPipeline:
+    """
+    Background stage for POST /jobs: payloads are queued and a single worker task
+    saves companies, saves jobs and embeds new descriptions, one ingestion at a time.
+
+    Statuses are written to `statuses` (see INGESTION_STATUS_BACKEND), with the
+    redis backend every API worker can answer the status endpoint. The queue
+    itself lives in the accepting process: ingestions still queued or running
+    at shutdown are marked failed, to be resubmitted.
+    """
+
+    def __init__(self, queue_size: int, statuses):
+        self.queue_size = queue_size
+        self.statuses = statuses
+        self._db: Optional[PostgresDB] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self, db: PostgresDB):
+        self._db = db
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if not self._queue.empty():
+            logger.warning(f"IngestionPipeline: dropping {self._queue.qsize()} queued ingestions")
+        while not self._queue.empty():
+            status, _ = self._queue.get_nowait()
+            await self._fail(status, "dropped at shutdown before it ran, resubmit the upload")
+        await self.statuses.close()
+
+    async def submit(self, job_posts: list[JobPost]) -> IngestionStatus:
+        status = IngestionStatus(
+            ingestion_id=uuid.uuid4().hex,
+            jobs_received=len(job_posts),
+            created_at=time.time(),
+        )
+        try:
+            self._queue.put_nowait((status, job_posts))
+        except asyncio.QueueFull:
+            raise IngestionQueueFull(f"{self.queue_size} ingestions already queued")
+        await self._save(status)
+        return status
+
+    async def get(self, ingestion_id: str) -> Optional[IngestionStatus]:
+        status = await self.statuses.get(ingestion_id)
+        return IngestionStatus(**status) if status else None
+
+    async def _save(self, status: IngestionStatus):
+        await self.statuses.set(status.ingestion_id, status.dict())
+
+    async def _fail(self, status: IngestionStatus, reason: str):
+        status.state = IngestionState.failed
+        status.failures.append(reason)
+        status.finished_at = time.time()
+        await self._save(status)
+
+    async def _run(self):
+        while True:
+            status, job_posts = await self._queue.get()
+            try:
+                await self._process(status, job_posts)
+            except Exception:
+                # keep the single worker alive for the ingestions queued behind
+                logger.exception(f"IngestionPipeline: {status.ingestion_id} failed outside processing")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, status: IngestionStatus, job_posts: list[JobPost]):
+        logger.debug(f"IngestionPipeline: processing {status.ingestion_id} ({status.jobs_received} jobs)")
+        status.state = IngestionState.running
+        await self._save(status)
+
+        async def _on_embedded(count: int):
+            status.jobs_embedded += count
+            await self._save(status)
+
+        try:
+            # an empty payload only runs the embedding backfill
+            if job_posts:
+                company_ids = await DBService.save_companies_to_postgres(self._db, job_posts)
+                status.companies_resolved = len(company_ids)
+                status.jobs_written = await DBService.save_jobs_to_postgres(self._db, job_posts, company_ids)
+                await self._save(status)
+            await DBService.embed_job_description_vector(self._db, on_progress=_on_embedded)
+            status.state = IngestionState.done
+        except asyncio.CancelledError:
+            await self._fail(status, "interrupted by shutdown, resubmit the upload")
+            raise
+        except Exception as exc:
+            logger.exception(f"IngestionPipeline: {status.ingestion_id} failed")
+            status.failures.append(f"{type(exc).__name__}: {exc}")
+            status.state = IngestionState.failed
+        finally:
+            status.finished_at = status.finished_at or time.time()
+            await self._save(status)
+            if status.jobs_written or status.jobs_embedded:
+                await invalidate_search_cache()
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Re-split an arbitrarily chunked byte stream into lines"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def ingest_ndjson(
+    db: PostgresDB, chunks: AsyncIterator[bytes], batch_size: int
+) -> StreamIngestionResult:
+    """
+    Parse newline-delimited JobPost records as they stream in and write them
+    in batches of `batch_size`, so at most one batch is held in memory.
+    Invalid lines are reported (up to NDJSON_MAX_ERRORS) and skipped.
+    Embedding is left to the caller.
+    """
+    result = StreamIngestionResult()
+    batch: list[JobPost] = []
+
+    async def _flush():
+        company_ids = await DBService.save_companies_to_postgres(db, batch)
+        result.jobs_written += await DBService.save_jobs_to_postgres(db, batch, company_ids)
+        batch.clear()
+
+    line_number = 0
+    async for line in _iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            batch.append(JobPost.parse_raw(line))
+        except ValidationError as exc:
+            result.jobs_rejected += 1
+            if len(result.errors) < config.NDJSON_MAX_ERRORS:
+                result.errors.append(f"line {line_number}: {exc}")
+            continue
+        result.jobs_received += 1
+        if len(batch) >= batch_size:
+            await _flush()
+
+    if batch:
+        await _flush()
+    return result
+
+
+ingestion_pipeline = IngestionPipeline(
+    queue_size=config.INGESTION_QUEUE_SIZE,
+    statuses=make_cache_backend(
+        config.INGESTION_STATUS_BACKEND,
+        maxsize=config.INGESTION_HISTORY_SIZE,
+        ttl=config.INGESTION_STATUS_TTL,
+        redis_url=config.REDIS_URL,
+        prefix="ingestion:status:",
+    ),
+)
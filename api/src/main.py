@@ -1,31 +1,65 @@
+import asyncio
 import logging
-from typing import Optional
+import time
+from typing import Optional, Union
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, status, HTTPException
+from fastapi import FastAPI, Request, Response, status, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 import httpx
 from fastapi import Depends
 
-from src import config
+from src import ai_model, config
 from src.db_pg import PostgresDB
-from src.domain import CompanyDB, JobPost, JobResponse, NLURequest, NLUResponse, NLUEntity
+from src.domain import (
+    CompanyDB, IngestionStatus, JobPost, JobResponse, JobSummary, JobView, NLURequest, NLUResponse,
+    NLUEntity, RerankWeights, SearchResponse, StreamIngestionResult
+)
 from src.db_service import DBService
+from src.ai_batcher import embedding_batcher
+from src.ai_cache import embed_query, prewarm_from_file, query_embedding_cache
+from src.ai_executor import EmbeddingQueueFull, embedding_executor
+from src.ingestion import IngestionQueueFull, ingest_ndjson, ingestion_pipeline
+from src.migrations import migrate
+from src.nlu import cached_parse, nlu_cache, nlu_client, search_entities
+from src.pagination import NEXT_CURSOR_HEADER, PageParams, set_next_cursor
+from src.search_cache import cached_search_jobs, invalidate_search_cache, search_cache
+from src.serialization import orjson_response, project_records, records_response
 
 
 logger = logging.getLogger('uvicorn')
 logger.setLevel(config.UVICORN_LOGGING_LEVEL)
 
+if config.EMBEDDING_MODEL_PRELOAD:
+    ai_model.preload()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     db = PostgresDB()
+    if config.MIGRATE_ON_STARTUP:
+        await migrate(db.dsn)
     await db.connect()
     app.state.database = db
+    embedding_executor.start()
+    if config.EMBEDDING_MODEL_WARMUP:
+        await embedding_executor.warmup()
+    if config.EMBEDDING_CACHE_PREWARM_FILE:
+        await prewarm_from_file(config.EMBEDDING_CACHE_PREWARM_FILE)
+    ingestion_pipeline.start(db)
+    nlu_client.start()
 
     yield
     # Anything after yield is called at shutdown
+    await nlu_client.close()
+    if nlu_cache:
+        await nlu_cache.close()
+    await ingestion_pipeline.stop()
+    if search_cache:
+        await search_cache.close()
+    embedding_executor.shutdown()
     await app.state.database.disconnect()
 
 
@@ -46,16 +80,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+def escape_like(value: str) -> str:
+    """Match `value` literally inside a LIKE pattern"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# GET /jobs SELECT lists per view, the summary skips the multi-KB job_description
+JOB_COLUMNS = {
+    JobView.full: """
+        jobs.job_id, jobs.job_post_id, jobs.job_title, jobs.job_location,
+        jobs.workplace_type, jobs.posted_date, jobs.posted_timestamp,
+        jobs.job_description, companies.company_id, companies.company_name,
+        jobs.contact
+    """,
+    JobView.summary: """
+        jobs.job_id, jobs.job_title, jobs.job_location, jobs.workplace_type,
+        jobs.posted_date, jobs.posted_timestamp, companies.company_id, companies.company_name
+    """,
+}
+
+JOB_MODELS = {JobView.full: JobResponse, JobView.summary: JobSummary}
+
+# documents list responses, which are encoded by records_response
+JobList = Union[list[JobResponse], list[JobSummary]]
+
+
 def get_database() -> PostgresDB:
     return app.state.database
 
+
+@app.exception_handler(EmbeddingQueueFull)
+async def embedding_queue_full_handler(request: Request, exc: EmbeddingQueueFull):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"Embedding service is busy - {exc}"},
+    )
+
+
 @app.get("/_status/healthz")
 async def root():
     return {"message": "OK"}
 
 
+@app.get("/_status/stats")
+async def stats():
+    return {
+        "embedding_batcher": embedding_batcher.stats(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "hybrid_query_templates": DBService.hybrid_query_template.cache_info()._asdict(),
+        # hybrid search statements: hits skip parse and analysis, prepares don't
+        "hybrid_prepared_statements": get_database().prepared_stats(),
+        "search_cache": search_cache.stats() if search_cache else None,
+        "nlu_cache": nlu_cache.stats() if nlu_cache else None,
+    }
+
+
 # Define API endpoints
 @app.get("/jobs/{job_id}", response_model=JobResponse)
 async def get_job_id(job_id: int, db: PostgresDB = Depends(get_database)):
@@ -77,82 +159,151 @@ async def get_job_id(job_id: int, db: PostgresDB = Depends(get_database)):
     return job
 
 
-@app.get("/jobs", response_model=list[JobResponse])
+@app.get("/jobs", response_model=JobList)
 async def get_jobs(
+    response: Response,
     job_title: Optional[str] = None,
     job_location: Optional[str] = None,
     job_description: Optional[str] = None,
     workplace_type: Optional[str] = None,
     sort_by_posted_timestamp: Optional[bool] = False,
+    view: JobView = JobView.full,
+    page: PageParams = Depends(),
     db: PostgresDB = Depends(get_database)
 ):
-    query = """
-    SELECT jobs.job_id, jobs.job_post_id, jobs.job_title, jobs.job_location,
-        jobs.workplace_type, jobs.posted_date, jobs.posted_timestamp,
-        jobs.job_description, companies.company_id, companies.company_name,
-        jobs.contact
+    """
+    List jobs, one page at a time. Pages are keyed on (posted_timestamp, job_id)
+    when sorting by posted_timestamp and on job_id otherwise, follow the
+    X-Next-Cursor response header for the next page.
+    `view=summary` returns JobSummary entries without description and contact.
+    """
+    query = f"""
+    SELECT {JOB_COLUMNS[view]}
     FROM jobs
     INNER JOIN companies ON jobs.company_id = companies.company_id
     """
 
+    # ILIKE is served by the trigram indexes, job_description by its tsvector
+    # column and GIN index (see src/migrations.py)
+    conditions = []
     params = []
     if job_title:
-        query += " WHERE jobs.job_title LIKE %s"
-        params.append(f"%{job_title}%")
+        conditions.append("jobs.job_title ILIKE %s")
+        params.append(f"%{escape_like(job_title)}%")
     if job_location:
-        if not job_title:
-            query += " WHERE"
-        else:
-            query += " AND"
-        query += " jobs.job_location LIKE %s"
-        params.append(f"%{job_location}%")
+        conditions.append("jobs.job_location ILIKE %s")
+        params.append(f"%{escape_like(job_location)}%")
     if job_description:
-        if not job_title and not job_location:
-            query += " WHERE"
-        else:
-            query += " AND"
-        query += " jobs.job_description LIKE %s"
-        params.append(f"%{job_description}%")
+        conditions.append("jobs.job_description_tsv @@ plainto_tsquery('simple', %s)")
+        params.append(job_description)
     if workplace_type:
-        if not job_title and not job_location and not job_description:
-            query += " WHERE"
-        else:
-            query += " AND"
-        query += " jobs.workplace_type = %s"
+        conditions.append("jobs.workplace_type = %s")
         params.append(workplace_type)
 
     if sort_by_posted_timestamp:
-        query += " ORDER BY jobs.posted_timestamp DESC"
+        after = page.after(int, int)
+        if after:
+            conditions.append("(COALESCE(jobs.posted_timestamp, 0), jobs.job_id) < (%s, %s)")
+            params.extend(after)
+        order_by = "COALESCE(jobs.posted_timestamp, 0) DESC, jobs.job_id DESC"
+    else:
+        after = page.after(int)
+        if after:
+            conditions.append("jobs.job_id > %s")
+            params.extend(after)
+        order_by = "jobs.job_id"
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order_by} LIMIT %s"
+    params.append(page.limit)
 
     # Convert ? placeholders to numbered placeholders ($1 $2 ..)
     query = query.replace("%s", "${}").format(*tuple(range(1, query.count("%s") + 1)))
 
     rows = await db.fetch(query, *params)
+    if rows:
+        last = rows[-1]
+        if sort_by_posted_timestamp:
+            set_next_cursor(response, rows, page.limit, last['posted_timestamp'] or 0, last['job_id'])
+        else:
+            set_next_cursor(response, rows, page.limit, last['job_id'])
 
-    jobs = []
-    for row in rows:
-        job = JobResponse(**row)
-        jobs.append(job)
-
-    return jobs
+    return records_response(rows, JOB_MODELS[view], response)
 
 
-@app.post("/jobs", status_code=status.HTTP_201_CREATED)
-async def post_job(job_posts: list[JobPost], db: PostgresDB = Depends(get_database)):
-    await DBService.save_companies_to_postgres(db, job_posts)
-    await DBService.save_jobs_to_postgres(db, job_posts)
+@app.post(
+    "/jobs",
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": IngestionStatus}},
+)
+async def post_job(
+    job_posts: list[JobPost],
+    background: bool = config.INGESTION_BACKGROUND,
+    db: PostgresDB = Depends(get_database)
+):
+    if background:
+        try:
+            ingestion = await ingestion_pipeline.submit(job_posts)
+        except IngestionQueueFull as exc:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=ingestion.dict())
+
+    company_ids = await DBService.save_companies_to_postgres(db, job_posts)
+    await DBService.save_jobs_to_postgres(db, job_posts, company_ids)
     await DBService.embed_job_description_vector(db)
+    await invalidate_search_cache()
     return {"message": "Jobs saved successfully"}
 
 
+@app.post(
+    "/jobs/ndjson",
+    status_code=status.HTTP_201_CREATED,
+    response_model=StreamIngestionResult,
+)
+async def post_jobs_ndjson(
+    request: Request,
+    background: bool = config.INGESTION_BACKGROUND,
+    db: PostgresDB = Depends(get_database)
+):
+    """
+    Ingest newline-delimited JSON, one JobPost per line (application/x-ndjson).
+    Records are validated and written in batches while the body streams in.
+    """
+    result = await ingest_ndjson(db, request.stream(), config.NDJSON_BATCH_SIZE)
+    if background:
+        try:
+            result.ingestion = await ingestion_pipeline.submit([])
+        except IngestionQueueFull as exc:
+            logger.warning(f"Skipping background embedding - {exc}")
+    else:
+        await DBService.embed_job_description_vector(db)
+    await invalidate_search_cache()
+    return result
+
+
+@app.get("/ingestions/{ingestion_id}", response_model=IngestionStatus)
+async def get_ingestion(ingestion_id: str):
+    ingestion = await ingestion_pipeline.get(ingestion_id)
+    if not ingestion:
+        raise HTTPException(status_code=404, detail="Ingestion not found")
+    return ingestion
+
+
 @app.post("/query", response_model=NLUResponse)
 async def post_query(query: NLURequest):
+    return await parse_query(query.text)
+
+
+async def parse_query(text: str) -> NLUResponse:
+    """cached_parse with NLU failures mapped to HTTP errors"""
     try:
-        resp = httpx.post(config.ENDPOINT_NLU, json=query.dict())
-        resp.raise_for_status()
-        response_data = resp.json()
-        response_model = NLUResponse(**response_data)
-        return response_model
+        return await cached_parse(text)
+    except httpx.TimeoutException as exc:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"NLU request timed out - {type(exc).__name__}",
+        )
     except httpx.HTTPError as exc:
         raise HTTPException(
             status_code=500,
@@ -165,12 +316,88 @@ async def post_query(query: NLURequest):
         )
 
 
-@app.post("/jobs_entities", response_model=list[JobResponse])
-async def get_jobs_by_entities(entities: list[NLUEntity],  db: PostgresDB = Depends(get_database)):
-    sql, params = DBService.compile_hybrid_query(entities)
-
-    rows = await db.fetch(sql, *params)
-    return [JobResponse(**row) for row in rows]
+@app.post("/jobs_entities", response_model=JobList)
+async def get_jobs_by_entities(
+    entities: list[NLUEntity],
+    response: Response,
+    weights: RerankWeights = Depends(),
+    strict: bool = config.HYBRID_STRICT_FILTERS,
+    view: JobView = JobView.full,
+    page: PageParams = Depends(),
+    db: PostgresDB = Depends(get_database)
+):
+    """
+    Rank jobs by the given entities, one page at a time. Pages are keyed on
+    (rerank_score, job_id), follow the X-Next-Cursor response header for the
+    next page.
+    """
+    # the cursor also pins the strict mode the first page ended up using
+    after = page.after(float, int, bool)
+    if after:
+        *after, strict = after
+    rows, strict = await cached_search_jobs(db, entities, weights, strict, page.limit, after)
+    if rows:
+        last = rows[-1]
+        set_next_cursor(response, rows, page.limit, last['rerank_score'], last['job_id'], strict)
+    return records_response(rows, JOB_MODELS[view], response)
+
+
+@app.post("/search", response_model=SearchResponse)
+async def search(
+    query: NLURequest,
+    response: Response,
+    weights: RerankWeights = Depends(),
+    strict: bool = config.HYBRID_STRICT_FILTERS,
+    view: JobView = JobView.full,
+    page: PageParams = Depends(),
+    db: PostgresDB = Depends(get_database)
+):
+    """
+    Parse free text with NLU and rank jobs by it in one round trip: the full
+    text is the semantic query and the extracted entities add fuzzy keyword
+    terms, as in /jobs_entities. The text is embedded while NLU is in flight.
+    Paged like /jobs_entities, `timings` breaks the request down per stage (ms).
+    """
+    after = page.after(float, int, bool)
+    if after:
+        *after, strict = after
+    started = time.perf_counter()
+    timings = {}
+
+    async def _embed():
+        await embed_query(query.text)
+        timings["embedding"] = (time.perf_counter() - started) * 1000
+
+    # warms query_embedding_cache, so the search below gets a cache hit
+    embedding = asyncio.create_task(_embed())
+    try:
+        nlu = await parse_query(query.text)
+        timings["nlu"] = (time.perf_counter() - started) * 1000
+        await embedding
+    finally:
+        if not embedding.done():
+            embedding.cancel()
+
+    entities = search_entities(nlu)
+    search_started = time.perf_counter()
+    rows, strict = await cached_search_jobs(
+        db, entities, weights, strict, page.limit, after, semantic_text=query.text)
+    timings["search"] = (time.perf_counter() - search_started) * 1000
+    timings["total"] = (time.perf_counter() - started) * 1000
+
+    if rows:
+        last = rows[-1]
+        set_next_cursor(response, rows, page.limit, last['rerank_score'], last['job_id'], strict)
+    return orjson_response(
+        {
+            "text": query.text,
+            "entities": [entity.dict() for entity in entities],
+            "strict": strict,
+            "jobs": project_records(rows, JOB_MODELS[view]),
+            "timings": {stage: round(ms, 2) for stage, ms in timings.items()},
+        },
+        response,
+    )
 
 
 @app.get("/companies/{company_id}", response_model=CompanyDB)
@@ -190,9 +417,24 @@ async def get_company_by_id(company_id: int, db: PostgresDB = Depends(get_databa
 
 
 @app.get("/companies", response_model=list[CompanyDB])
-async def get_companies(db: PostgresDB = Depends(get_database)):
+async def get_companies(
+    response: Response,
+    page: PageParams = Depends(),
+    db: PostgresDB = Depends(get_database)
+):
+    """List companies by company_id, follow the X-Next-Cursor response header for the next page"""
+    after = page.after(int)
     rows = await db.fetch(
-        "SELECT company_id, company_name, company_description FROM companies"
+        """
+        SELECT company_id, company_name, company_description
+        FROM companies
+        WHERE company_id > $1
+        ORDER BY company_id
+        LIMIT $2
+        """,
+        after[0] if after else 0,
+        page.limit,
     )
-    companies = [CompanyDB(**company) for company in rows]
-    return companies
+    if rows:
+        set_next_cursor(response, rows, page.limit, rows[-1]['company_id'])
+    return records_response(rows, CompanyDB, response)
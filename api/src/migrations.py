@@ -0,0 +1,147 @@
+"""
+Versioned schema migrations, applied in order and recorded in `schema_migrations`.
+
+Every migration is idempotent (IF NOT EXISTS), so databases created by hand from
+sql_docs.md can be brought under management as-is. Run from api/:
+    python -m src.migrations
+or set MIGRATE_ON_STARTUP=true to apply pending migrations in the API lifespan.
+
+The ivfflat index on job_description_vector (sql_docs.md step 8) is not a
+migration: ivfflat derives its lists from the rows present when it is built, so
+it must be created by hand once jobs are loaded and embedded. Without it the
+hybrid search vector stage sorts every job by distance.
+"""
+import asyncio
+import logging
+
+import asyncpg
+
+from src.db_pg import PostgresDB
+
+logger = logging.getLogger('uvicorn')
+
+# Held while migrating, so concurrently starting workers don't race each other
+MIGRATIONS_LOCK_ID = 0x6A6F6273  # "jobs"
+
+# (version, name, sql), append only: never edit a migration that has shipped
+MIGRATIONS: list[tuple[int, str, str]] = [
+    (
+        1,
+        "baseline schema",
+        """
+        CREATE EXTENSION IF NOT EXISTS vector;
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+        CREATE TABLE IF NOT EXISTS companies (
+            company_id SERIAL PRIMARY KEY,
+            company_name TEXT UNIQUE,
+            company_description TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id SERIAL PRIMARY KEY,
+            job_post_id TEXT UNIQUE,
+            job_title TEXT,
+            job_location TEXT,
+            workplace_type TEXT,
+            posted_date TEXT,
+            posted_timestamp INTEGER DEFAULT (extract(epoch from now())),
+            job_description TEXT,
+            job_description_vector vector(384),
+            company_id INTEGER,
+            contact TEXT,
+            FOREIGN KEY (company_id) REFERENCES companies(company_id)
+        );
+        """,
+    ),
+    (
+        2,
+        "jobs content_hash",
+        """
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+        UPDATE jobs
+        SET content_hash = encode(sha256(convert_to(concat_ws(chr(31),
+            coalesce(job_title, ''), coalesce(job_location, ''),
+            coalesce(workplace_type, ''), coalesce(job_description, '')), 'UTF8')), 'hex')
+        WHERE content_hash IS NULL;
+        """,
+    ),
+    (
+        3,
+        "trigram indexes on short job fields",
+        """
+        CREATE INDEX IF NOT EXISTS job_title_trgm_idx ON jobs USING gin (job_title gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS job_location_trgm_idx ON jobs USING gin (job_location gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS workplace_type_trgm_idx ON jobs USING gin (workplace_type gin_trgm_ops);
+        """,
+    ),
+    (
+        4,
+        "job_description full-text search",
+        # 'simple' (no stemming, no stop words) since descriptions mix Hebrew and English,
+        # GET /jobs must query with the same configuration for the index to apply
+        """
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS job_description_tsv tsvector
+            GENERATED ALWAYS AS (to_tsvector('simple', coalesce(job_description, ''))) STORED;
+
+        CREATE INDEX IF NOT EXISTS job_description_tsv_idx ON jobs USING gin (job_description_tsv);
+        """,
+    ),
+    (
+        5,
+        "keyset pagination index",
+        """
+        CREATE INDEX IF NOT EXISTS jobs_posted_timestamp_job_id_idx
+        ON jobs ((COALESCE(posted_timestamp, 0)) DESC, job_id DESC);
+        """,
+    ),
+]
+
+
+async def migrate(dsn: str) -> list[int]:
+    """
+    Apply pending migrations, each in its own transaction. Returns the applied versions.
+    Uses a dedicated connection rather than the pool, whose init needs the `vector`
+    type that the baseline migration creates.
+    """
+    applied = []
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_ID)
+        try:
+            await connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+            done = {row["version"] for row in await connection.fetch("SELECT version FROM schema_migrations")}
+            for version, name, sql in MIGRATIONS:
+                if version in done:
+                    continue
+                logger.info(f"migrations: applying {version} ({name})")
+                async with connection.transaction():
+                    await connection.execute(sql)
+                    await connection.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)", version, name
+                    )
+                applied.append(version)
+        finally:
+            await connection.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_ID)
+    finally:
+        await connection.close()
+    return applied
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    applied = await migrate(PostgresDB().dsn)
+    print(f"applied {applied}" if applied else "schema is up to date")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+
+import httpx
+from pydantic import ValidationError
+
+from src import config
+from src.cache import make_cache_backend
+from src.domain import NLUEntity, NLUResponse
+
+logger = logging.getLogger('uvicorn')
+
+
+class NLUClient:
+    """
+    Async client for the Rasa NLU parse endpoint, shared by all requests of a worker.
+
+    Connections are kept alive and reused. At most `max_connections` parse calls
+    are in flight at once: further calls wait up to `pool_timeout` seconds for a
+    free connection and then fail with httpx.PoolTimeout, so a slow NLU server
+    only holds up the requests that need it.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        status_endpoint: str,
+        model_check_interval: float,
+        connect_timeout: float,
+        read_timeout: float,
+        pool_timeout: float,
+        max_connections: int,
+        max_keepalive_connections: int,
+    ):
+        self.endpoint = endpoint
+        self.status_endpoint = status_endpoint
+        self.model_check_interval = model_check_interval
+        self._model_id = ""
+        self._model_checked_at = float("-inf")
+        self.timeout = httpx.Timeout(
+            read_timeout, connect=connect_timeout, read=read_timeout, pool=pool_timeout
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            logger.debug(f"NLUClient: started (limits={self.limits})")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def parse(self, text: str) -> NLUResponse:
+        """Parse `text` with Rasa, raises httpx.HTTPError or pydantic ValidationError"""
+        self.start()
+        resp = await self._client.post(self.endpoint, json={"text": text})
+        resp.raise_for_status()
+        return NLUResponse(**resp.json())
+
+    async def model_id(self) -> str:
+        """
+        Id of the model Rasa currently serves, from its /status endpoint, re-checked
+        at most every `model_check_interval` seconds. The last known id is kept
+        when the check fails.
+        """
+        now = time.monotonic()
+        if now - self._model_checked_at < self.model_check_interval:
+            return self._model_id
+        # claim the check before awaiting, so concurrent requests don't all poll
+        self._model_checked_at = now
+        self.start()
+        try:
+            resp = await self._client.get(self.status_endpoint)
+            resp.raise_for_status()
+            data = resp.json()
+            model_id = str(data.get("model_id") or data.get("model_file") or "")
+        except (httpx.HTTPError, ValueError) as exc:
+            logger.warning(f"NLUClient: model status check failed - {exc}")
+            return self._model_id
+        if model_id != self._model_id:
+            logger.info(f"NLUClient: serving model {model_id!r}")
+            self._model_id = model_id
+        return self._model_id
+
+
+nlu_client = NLUClient(
+    endpoint=config.ENDPOINT_NLU,
+    status_endpoint=config.NLU_STATUS_ENDPOINT,
+    model_check_interval=config.NLU_MODEL_CHECK_INTERVAL,
+    connect_timeout=config.NLU_CONNECT_TIMEOUT,
+    read_timeout=config.NLU_READ_TIMEOUT,
+    pool_timeout=config.NLU_POOL_TIMEOUT,
+    max_connections=config.NLU_MAX_CONNECTIONS,
+    max_keepalive_connections=config.NLU_MAX_KEEPALIVE_CONNECTIONS,
+)
+
+nlu_cache = make_cache_backend(
+    config.NLU_CACHE_BACKEND,
+    maxsize=config.NLU_CACHE_SIZE,
+    ttl=config.NLU_CACHE_TTL,
+    redis_url=config.REDIS_URL,
+    prefix="nlu:parse:",
+)
+
+
+def nlu_cache_key(model_id: str, text: str) -> str:
+    payload = json.dumps([model_id, text])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+async def cached_parse(text: str) -> NLUResponse:
+    """
+    nlu_client.parse through nlu_cache. `text` should already be clean_text'ed
+    (NLURequest does it). Whitespace is collapsed, and that text is both what
+    Rasa parses and the key, so a cached response, entity offsets included, is
+    exactly what Rasa returns for every query sharing it. Case is kept: DIET is
+    trained on casing features (LexicalSyntacticFeaturizer), so "Tel Aviv" and
+    "tel aviv" may parse differently and are cached separately. Keys include the
+    served model id, a retrained model starts from an empty cache.
+    """
+    text = " ".join(text.split())
+    if nlu_cache is None:
+        return await nlu_client.parse(text)
+
+    key = nlu_cache_key(await nlu_client.model_id(), text)
+    cached = await nlu_cache.get(key)
+    if cached is not None:
+        return NLUResponse(**cached)
+    response = await nlu_client.parse(text)
+    await nlu_cache.set(key, response.dict())
+    return response
+
+
+def search_entities(nlu: NLUResponse) -> list[NLUEntity]:
+    """Entities of an NLU parse that hybrid search can rank by, others are dropped"""
+    entities = []
+    for entity in nlu.entities or []:
+        try:
+            entities.append(NLUEntity(entity=entity.get("entity"), value=entity.get("value")))
+        except ValidationError:
+            continue
+    return entities
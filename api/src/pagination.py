@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException, Query, Response, status
+
+from src import config
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Common `limit` / `cursor` query parameters of paginated endpoints"""
+
+    def __init__(
+        self,
+        limit: int = Query(config.PAGE_SIZE_DEFAULT, ge=1, le=config.PAGE_SIZE_MAX),
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+    def after(self, *types: type) -> Optional[list[Any]]:
+        """Decoded keyset values of the cursor, which must match `types` one to one"""
+        if self.cursor is None:
+            return None
+        try:
+            padded = self.cursor + "=" * (-len(self.cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded))
+        except (binascii.Error, ValueError):
+            values = None
+        if not isinstance(values, list) or len(values) != len(types) or not all(
+            _is_instance(value, expected) for value, expected in zip(values, types)
+        ):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        return values
+
+
+def _is_instance(value: Any, expected: type) -> bool:
+    # JSON has no int/float distinction, and bool must not pass as int
+    if expected is float:
+        expected = (int, float)
+    return isinstance(value, expected) and (expected is bool or not isinstance(value, bool))
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, *values: Any):
+    """Advertise the next page when this one is full, `values` key its last row"""
+    if len(rows) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*values)
@@ -0,0 +1,99 @@
+# Hybrid search latency vs. table size: the previous single-stage query (rerank
+# every row, then sort) vs. DBService.compile_hybrid_query's two-stage plan.
+# Grows the jobs table with synthetic rows (random vectors) tagged with a unique
+# prefix and deletes them afterwards. Run from api/:
+#   python -m src.playground.bench_hybrid_query [size ...]
+
+import asyncio
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from src.db_pg import PostgresDB
+from src.db_service import DBService
+from src.domain import NLUEntity
+
+ENTITIES = [
+    NLUEntity(entity="job_title", value="python developer"),
+    NLUEntity(entity="skills", value="django"),
+    NLUEntity(entity="job_location", value="haifa"),
+    NLUEntity(entity="workplace_type", value="remote"),
+]
+
+SINGLE_STAGE_SQL = """
+SELECT job_id, job_post_id, job_title, job_location, workplace_type,
+posted_date, posted_timestamp, contact, jobs.company_id, companies.company_name,
+jobs_rerank_score(
+    (1 - (job_description_vector <=> $1)),
+    GREATEST(SIMILARITY(lower(job_title), lower($2))),
+    GREATEST(SIMILARITY(lower(job_location), lower($3))),
+    GREATEST(SIMILARITY(lower(workplace_type), lower($4)))
+) as rerank_score
+FROM jobs
+INNER JOIN companies ON jobs.company_id = companies.company_id
+ORDER BY rerank_score DESC
+LIMIT 30
+"""
+
+TITLES = ["Python Developer", "Backend Engineer", "Data Scientist", "DevOps Engineer", "QA Automation"]
+LOCATIONS = ["Haifa, Israel", "Tel Aviv-Yafo, Israel", "Jerusalem, Israel", "Herzliya, Israel"]
+WORKPLACE_TYPES = ["Remote", "Hybrid", "On-site"]
+
+
+async def grow_table(db: PostgresDB, prefix: str, company_id: int, start: int, stop: int):
+    rng = np.random.default_rng(start)
+    await db.executemany(
+        """
+        INSERT INTO jobs (job_post_id, job_title, job_location, workplace_type, posted_date,
+            job_description, job_description_vector, company_id)
+        VALUES ($1, $2, $3, $4, 'today', 'synthetic', $5, $6)
+        """,
+        [
+            (f"{prefix}-{i}", TITLES[i % len(TITLES)], LOCATIONS[i % len(LOCATIONS)],
+             WORKPLACE_TYPES[i % len(WORKPLACE_TYPES)],
+             rng.standard_normal(384).astype(np.float32), company_id)
+            for i in range(start, stop)
+        ],
+    )
+
+
+async def timed(db: PostgresDB, sql: str, params: list, runs: int = 10) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await db.fetch(sql, *params)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+async def main(sizes: list[int]):
+    db = PostgresDB()
+    await db.connect()
+    prefix = f"bench{int(time.time())}"
+    row = await db.fetchrow(
+        "INSERT INTO companies (company_name) VALUES ($1) RETURNING company_id",
+        f"{prefix} Company",
+    )
+    company_id = row["company_id"]
+    try:
+        two_stage_sql, params = await DBService.compile_hybrid_query(ENTITIES)
+        single_stage_params = [params[0], "python developer", "haifa", "remote"]
+        inserted = 0
+        for size in sizes:
+            await grow_table(db, prefix, company_id, inserted, size)
+            inserted = size
+            await db.execute("ANALYZE jobs")
+            total = (await db.fetchrow("SELECT count(*) FROM jobs"))[0]
+            single = await timed(db, SINGLE_STAGE_SQL, single_stage_params)
+            two_stage = await timed(db, two_stage_sql, params)
+            print(f"{total:>9} jobs: single-stage {single:8.1f} ms | two-stage {two_stage:8.1f} ms")
+    finally:
+        await db.execute("DELETE FROM jobs WHERE job_post_id LIKE $1", f"{prefix}-%")
+        await db.execute("DELETE FROM companies WHERE company_id = $1", company_id)
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(n) for n in sys.argv[1:]] or [1_000, 10_000, 100_000]))
@@ -0,0 +1,80 @@
+# Ingestion throughput: per-row INSERT round trips (the previous POST /jobs path)
+# vs. DBService's COPY + set-based INSERT. Inserts synthetic rows tagged with a
+# unique prefix and deletes them afterwards. Run from api/:
+#   python -m src.playground.bench_ingest [n_jobs]
+
+import asyncio
+import sys
+import time
+
+from src.db_pg import PostgresDB
+from src.db_service import DBService
+from src.domain import JobPost
+
+
+def make_job_posts(n: int, prefix: str) -> list[JobPost]:
+    return [
+        JobPost(
+            job_post_id=f"{prefix}-{i}",
+            job_title=f"Python Developer {i}",
+            job_location="Tel Aviv-Yafo, Tel Aviv District, Israel",
+            workplace_type="Hybrid",
+            posted_date="2 days ago",
+            posted_timestamp=1700000000 + i,
+            job_description="We are looking for a backend engineer. " * 40,
+            contact=f"https://linkedin.com/jobs/view/{i}",
+            company_name=f"{prefix} Company {i % 500}",
+            company_description="A company.",
+        )
+        for i in range(n)
+    ]
+
+
+async def row_by_row(db: PostgresDB, job_posts: list[JobPost]):
+    companies = {p.company_name: p.company_description for p in job_posts}
+    await db.execute_transaction([
+        ("""INSERT INTO companies (company_name, company_description) VALUES ($1, $2)
+            ON CONFLICT ON CONSTRAINT companies_company_name_key DO NOTHING""", name, desc)
+        for name, desc in companies.items()
+    ])
+    rows = await db.fetch("SELECT company_id, company_name FROM companies")
+    company_ids = {row["company_name"]: row["company_id"] for row in rows}
+    await db.execute_transaction([
+        ("""INSERT INTO jobs (job_post_id, job_title, job_location, workplace_type,
+                posted_date, posted_timestamp, job_description, company_id, contact)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+            ON CONFLICT ON CONSTRAINT jobs_job_post_id_key DO NOTHING""",
+         p.job_post_id, p.job_title, p.job_location, p.workplace_type, p.posted_date,
+         p.posted_timestamp, p.job_description, company_ids[p.company_name], p.contact)
+        for p in job_posts
+    ])
+
+
+async def bulk(db: PostgresDB, job_posts: list[JobPost]):
+    company_ids = await DBService.save_companies_to_postgres(db, job_posts)
+    await DBService.save_jobs_to_postgres(db, job_posts, company_ids)
+
+
+async def cleanup(db: PostgresDB, prefix: str):
+    await db.execute("DELETE FROM jobs WHERE job_post_id LIKE $1", f"{prefix}-%")
+    await db.execute("DELETE FROM companies WHERE company_name LIKE $1", f"{prefix} %")
+
+
+async def main(n: int):
+    db = PostgresDB()
+    await db.connect()
+    try:
+        for name, fn in [("row by row", row_by_row), ("bulk COPY", bulk)]:
+            prefix = f"bench{int(time.time())}"
+            job_posts = make_job_posts(n, prefix)
+            start = time.perf_counter()
+            await fn(db, job_posts)
+            elapsed = time.perf_counter() - start
+            await cleanup(db, prefix)
+            print(f"{name:>12}: {n} jobs in {elapsed:.2f}s -> {n / elapsed:,.0f} rows/s")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
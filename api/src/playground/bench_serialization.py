@@ -0,0 +1,76 @@
+# List endpoint serialization cost: the previous path (a JobResponse per row, then
+# FastAPI's serialize_response validation + jsonable_encoder + json.dumps) vs.
+# src.serialization.records_response (orjson straight from the rows).
+# Uses synthetic dict rows shaped like GET /jobs results, no database needed.
+# Run from api/:
+#   python -m src.playground.bench_serialization [rows ...]
+
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.domain import JobResponse, JobSummary
+from src.serialization import records_response
+
+DESCRIPTION = "We are looking for a backend engineer to join our platform team. " * 60
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {
+            "job_id": i,
+            "job_post_id": f"post-{i}",
+            "job_title": "Backend Engineer",
+            "job_location": "Tel Aviv-Yafo, Israel",
+            "workplace_type": "Hybrid",
+            "posted_date": "2 days ago",
+            "posted_timestamp": 1_690_000_000 + i,
+            "job_description": DESCRIPTION,
+            "company_id": i % 50,
+            "company_name": f"Company {i % 50}",
+            "contact": None,
+        }
+        for i in range(count)
+    ]
+
+
+async def pydantic_path(rows: list[dict], model) -> bytes:
+    field = create_response_field(name="response", type_=list[model])
+    content = await serialize_response(field=field, response_content=[model(**row) for row in rows])
+    return JSONResponse(content).body
+
+
+async def orjson_path(rows: list[dict], model) -> bytes:
+    return records_response(rows, model, Response()).body
+
+
+async def timed(fn, rows, model, runs: int = 20) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn(rows, model)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+async def main(sizes: list[int]):
+    for size in sizes:
+        rows = make_rows(size)
+        for model in (JobResponse, JobSummary):
+            # both paths must produce the same document
+            assert json.loads(await pydantic_path(rows, model)) == json.loads(await orjson_path(rows, model))
+            slow = await timed(pydantic_path, rows, model)
+            fast = await timed(orjson_path, rows, model)
+            print(f"{size:>6} rows {model.__name__:<12}: pydantic {slow:8.2f} ms | orjson {fast:8.2f} ms"
+                  f" | x{slow / fast:5.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(n) for n in sys.argv[1:]] or [30, 200, 1000]))
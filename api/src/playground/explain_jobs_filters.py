@@ -0,0 +1,89 @@
+# Check that GET /jobs filters are served by the indexes from src/migrations.py
+# instead of sequential scans: EXPLAINs each filter predicate the way get_jobs
+# builds it and asserts the expected index shows up in the plan.
+# Grows the jobs table with synthetic rows tagged with a unique prefix (so the
+# planner has a reason to prefer the index) and deletes them afterwards. Run from api/:
+#   python -m src.playground.explain_jobs_filters [rows]
+
+import asyncio
+import json
+import sys
+import time
+
+from src.db_pg import PostgresDB
+from src.migrations import migrate
+
+WORDS = ["python", "django", "kubernetes", "react", "golang", "terraform", "kafka", "spark",
+         "postgres", "redis", "typescript", "airflow", "pytorch", "rust", "scala", "elixir"]
+TITLES = ["Backend Engineer", "Data Scientist", "DevOps Engineer", "QA Automation", "Team Lead"]
+LOCATIONS = ["Haifa, Israel", "Tel Aviv-Yafo, Israel", "Jerusalem, Israel", "Herzliya, Israel"]
+WORKPLACE_TYPES = ["Remote", "Hybrid", "On-site"]
+
+# (filter, predicate as built by get_jobs, parameter, index expected in the plan)
+CHECKS = [
+    ("job_title", "jobs.job_title ILIKE $1", "%python%", "job_title_trgm_idx"),
+    ("job_location", "jobs.job_location ILIKE $1", "%haifa%", "job_location_trgm_idx"),
+    ("job_description", "jobs.job_description_tsv @@ plainto_tsquery('simple', $1)", "elixir kafka",
+     "job_description_tsv_idx"),
+]
+
+
+async def grow_table(db: PostgresDB, prefix: str, company_id: int, rows: int):
+    await db.executemany(
+        """
+        INSERT INTO jobs (job_post_id, job_title, job_location, workplace_type, posted_date,
+            job_description, company_id)
+        VALUES ($1, $2, $3, $4, 'today', $5, $6)
+        """,
+        [
+            (f"{prefix}-{i}",
+             # a rare title / location so the filters are selective
+             "Python Developer" if i % 500 == 0 else TITLES[i % len(TITLES)],
+             "Haifa, Israel" if i % 400 == 0 else LOCATIONS[1 + i % (len(LOCATIONS) - 1)],
+             WORKPLACE_TYPES[i % len(WORKPLACE_TYPES)],
+             " ".join(WORDS[(i * k) % len(WORDS)] for k in (1, 3, 7)) + f" role number {i}",
+             company_id)
+            for i in range(rows)
+        ],
+    )
+
+
+def index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+async def main(rows: int):
+    db = PostgresDB()
+    await migrate(db.dsn)
+    await db.connect()
+    prefix = f"explain{int(time.time())}"
+    row = await db.fetchrow(
+        "INSERT INTO companies (company_name) VALUES ($1) RETURNING company_id",
+        f"{prefix} Company",
+    )
+    company_id = row["company_id"]
+    failed = 0
+    try:
+        await grow_table(db, prefix, company_id, rows)
+        await db.execute("ANALYZE jobs")
+        for name, predicate, param, index in CHECKS:
+            result = await db.fetchrow(
+                f"EXPLAIN (FORMAT JSON) SELECT jobs.job_id FROM jobs WHERE {predicate}", param
+            )
+            plan = json.loads(result[0])[0]["Plan"]
+            used = index_names(plan)
+            ok = index in used
+            failed += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name:<16} {plan['Node Type']:<20} indexes: {sorted(used)}")
+    finally:
+        await db.execute("DELETE FROM jobs WHERE job_post_id LIKE $1", f"{prefix}-%")
+        await db.execute("DELETE FROM companies WHERE company_id = $1", company_id)
+        await db.disconnect()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
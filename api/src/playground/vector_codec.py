@@ -0,0 +1,40 @@
+# Round-trip check for the binary pgvector codec registered by PostgresDB.
+# Run from api/ against a database with the vector extension:
+#   python -m src.playground.vector_codec
+
+import asyncio
+
+import numpy as np
+
+from src.db_pg import PostgresDB, decode_vector, encode_vector
+
+
+def offline_roundtrip():
+    vector = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+    decoded = decode_vector(encode_vector(vector))
+    assert decoded.dtype == np.float32
+    assert np.array_equal(decoded, vector)
+    print("offline round trip: OK")
+
+
+async def db_roundtrip():
+    db = PostgresDB()
+    await db.connect()
+    try:
+        vectors = np.random.default_rng(1).standard_normal((100, 384)).astype(np.float32)
+        for vector in vectors:
+            row = await db.fetchrow("SELECT $1::vector AS v", vector)
+            assert np.array_equal(row["v"], vector)
+
+        # the text representation must agree with what we send in binary
+        row = await db.fetchrow("SELECT $1::vector::text AS t", vectors[0])
+        parsed = np.array(row["t"].strip("[]").split(","), dtype=np.float32)
+        assert np.array_equal(parsed, vectors[0])
+        print(f"database round trip of {len(vectors)} vectors: OK")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    offline_roundtrip()
+    asyncio.run(db_roundtrip())
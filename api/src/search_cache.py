@@ -0,0 +1,81 @@
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from src import config
+from src.ai_cache import normalize_query
+from src.cache import make_cache_backend
+from src.db_pg import PostgresDB
+from src.db_service import DBService
+from src.domain import NLUEntity, RerankWeights
+
+logger = logging.getLogger('uvicorn')
+
+search_cache = make_cache_backend(
+    config.RESULT_CACHE_BACKEND,
+    maxsize=config.RESULT_CACHE_SIZE,
+    ttl=config.RESULT_CACHE_TTL,
+    redis_url=config.REDIS_URL,
+    prefix="jobs:search:",
+)
+
+
+def search_cache_key(
+    generation: int,
+    entities: list[NLUEntity],
+    weights: RerankWeights,
+    strict: bool,
+    limit: int,
+    after: Optional[list],
+    semantic_text: Optional[str] = None,
+) -> str:
+    """
+    Canonical key for a hybrid search: entities grouped by type (the order of
+    values within a type is kept, it shapes the semantic query) with normalized
+    values, plus the semantic text override, the ranking and paging options
+    and the data generation.
+    """
+    canonical = sorted(
+        ((entity.entity, normalize_query(entity.value)) for entity in entities),
+        key=lambda item: item[0],
+    )
+    semantic = normalize_query(semantic_text) if semantic_text else None
+    payload = json.dumps([generation, canonical, semantic, weights.dict(), strict, limit, after])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+async def cached_search_jobs(
+    db: PostgresDB,
+    entities: list[NLUEntity],
+    weights: RerankWeights,
+    strict: bool,
+    limit: int,
+    after: Optional[list] = None,
+    semantic_text: Optional[str] = None,
+) -> tuple[list[dict], bool]:
+    """DBService.search_jobs through search_cache, rows are returned as dicts"""
+
+    async def _search() -> tuple[list[dict], bool]:
+        rows, strict_used = await DBService.search_jobs(
+            db, entities, weights, strict, limit, tuple(after) if after else None, semantic_text)
+        return [dict(row) for row in rows], strict_used
+
+    generation = await search_cache.get_generation() if search_cache is not None else None
+    if generation is None:
+        return await _search()
+
+    key = search_cache_key(generation, entities, weights, strict, limit, after, semantic_text)
+    cached = await search_cache.get(key)
+    if cached is None:
+        cached = await _search()
+        await search_cache.set(key, cached)
+    rows, strict_used = cached
+    return rows, strict_used
+
+
+async def invalidate_search_cache():
+    """Called after ingestion writes, every cached search result becomes stale"""
+    if search_cache is not None:
+        await search_cache.bump_generation()
+        logger.debug("search_cache: bumped generation")
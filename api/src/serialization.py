@@ -0,0 +1,29 @@
+from typing import Any, Iterable, Mapping
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def records_response(
+    rows: Iterable[Mapping], model: type[BaseModel], response: Response
+) -> Response:
+    """
+    Encode database rows (asyncpg Records or dicts) straight to JSON bytes,
+    keyed like `model`, skipping per-row pydantic construction and FastAPI's
+    validate / jsonable_encoder pass. The route's response_model still documents
+    the schema, so rows must hold JSON-native values of the documented types.
+    Headers set on the injected `response` (e.g. X-Next-Cursor) are carried over.
+    """
+    return orjson_response(project_records(rows, model), response)
+
+
+def project_records(rows: Iterable[Mapping], model: type[BaseModel]) -> list[dict]:
+    """Rows as plain dicts holding exactly the fields of `model`"""
+    fields = tuple(model.__fields__)
+    return [{name: row.get(name) for name in fields} for row in rows]
+
+
+def orjson_response(content: Any, response: Response) -> Response:
+    """`content` encoded with orjson, with the headers set on the injected `response`"""
+    return Response(orjson.dumps(content), media_type="application/json", headers=dict(response.headers))
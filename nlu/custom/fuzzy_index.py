@@ -0,0 +1,74 @@
+import heapq
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Text, Tuple
+
+
+def trigrams(text: Text) -> List[Text]:
+    """Lowercased character trigrams, padded so short words still get some (like pg_trgm)"""
+    padded = f"  {' '.join(text.lower().split())} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class TrigramIndex:
+    """
+    Character-trigram inverted index over one lookup table.
+
+    `closest` first collects the `candidates` elements most similar to the
+    keyword by trigram overlap, then runs the exact (and slow) SequenceMatcher
+    scoring on those only, instead of on the whole table like
+    difflib.get_close_matches. Tables up to `candidates` elements are simply scanned.
+    """
+
+    def __init__(self, elements: Iterable[Text], candidates: int = 32) -> None:
+        self.elements = list(dict.fromkeys(elements))
+        self.candidates = candidates
+        self._postings: Dict[Text, List[int]] = defaultdict(list)
+        self._sizes: List[int] = []
+        for position, element in enumerate(self.elements):
+            grams = set(trigrams(element))
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(position)
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def shortlist(self, keyword: Text) -> List[Text]:
+        """
+        Elements most likely to match `keyword`, by trigram set similarity
+        (shared / union, like pg_trgm) so long elements aren't favoured just for
+        having more trigrams. Ties go to the element listed first.
+        """
+        if len(self.elements) <= self.candidates:
+            return self.elements
+        grams = set(trigrams(keyword))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        best = heapq.nsmallest(
+            self.candidates,
+            shared.items(),
+            key=lambda item: (-item[1] / (len(grams) + self._sizes[item[0]] - item[1]), item[0]),
+        )
+        return [self.elements[position] for position, _ in best]
+
+    def closest(self, keyword: Text, cutoff: float) -> Tuple[Text, float]:
+        """
+        Best element scoring at least `cutoff` (SequenceMatcher ratio) and its
+        score, or (`keyword`, 0) when nothing is close enough.
+        """
+        best, best_score = keyword, 0
+        matcher = SequenceMatcher()
+        # seq2 is cached by SequenceMatcher, set the fixed side once
+        matcher.set_seq2(keyword)
+        for element in self.shortlist(keyword):
+            matcher.set_seq1(element)
+            # cheap upper bounds first, as get_close_matches does
+            bound = max(cutoff, best_score)
+            if matcher.real_quick_ratio() < bound or matcher.quick_ratio() < bound:
+                continue
+            score = matcher.ratio()
+            if score >= cutoff and score > best_score:
+                best, best_score = element, score
+        return best, best_score
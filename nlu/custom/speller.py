@@ -1,6 +1,7 @@
 import logging
 import os
-from typing import Dict, Text, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Text, Any, List, Optional, Tuple
 
 from rasa.engine.graph import GraphComponent, ExecutionContext
 from rasa.engine.recipes.default_recipe import DefaultV1Recipe
@@ -9,17 +10,22 @@ from rasa.engine.storage.storage import ModelStorage
 from rasa.shared.nlu.training_data.message import Message
 from rasa.shared.nlu.training_data.training_data import TrainingData
 from rasa.nlu.extractors.extractor import EntityExtractorMixin
-from rasa.shared.nlu.constants import ENTITIES
+from rasa.shared.nlu.constants import ENTITIES, TEXT
 from rasa.shared.constants import DOCS_URL_TRAINING_DATA
 from rasa.nlu.utils import write_json_to_file
 from rasa.shared.utils.io import read_json_file, raise_warning
-from difflib import get_close_matches, SequenceMatcher
+
+from custom.fuzzy_index import TrigramIndex
 
 logger = logging.getLogger(__name__)
 
 CLOSEST_MATCH_MIN_SCORE=0.6
 SIMILARITY_MIN_SCORE=0.6
 DIET_MIN_SCORE=0.1
+# lookup table elements scored exactly per entity, picked by shared trigrams
+FUZZY_CANDIDATES=32
+# (entity type, raw value) -> (corrected value, score) pairs remembered
+CORRECTIONS_MEMO_SIZE=10000
 
 @DefaultV1Recipe.register(
     [DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR], is_trainable=True
@@ -27,6 +33,7 @@ DIET_MIN_SCORE=0.1
 class Speller(GraphComponent, EntityExtractorMixin):
 
     LOOKUP_TABLES_FILENAME = "lookup_tables.json"
+    MEMO_FILENAME = "speller_memo.json"
     KEYWORD_ENTITIES = ['job_location', 'workplace_type']
 
     def __init__(
@@ -35,11 +42,17 @@ class Speller(GraphComponent, EntityExtractorMixin):
         model_storage: ModelStorage,
         resource: Resource,
         lookup_tables: Optional[List[Dict[Text, Any]]] = None,
+        memo: Optional[List[List[Any]]] = None,
     ) -> None:
         self._config = config
         self._model_storage = model_storage
         self._resource = resource
         self.lookup_tables = lookup_tables if lookup_tables else []
+        self._build_indexes()
+        # LRU of corrections, seeded at train time and persisted with the model
+        self._memo: OrderedDict[Tuple[Text, Text], Tuple[Text, float]] = OrderedDict(
+            ((name, value), (corrected, score)) for name, value, corrected, score in memo or []
+        )
 
     @classmethod
     def create(
@@ -54,6 +67,8 @@ class Speller(GraphComponent, EntityExtractorMixin):
 
     def train(self, training_data: TrainingData) -> Resource:
         self.lookup_tables = training_data.lookup_tables
+        self._build_indexes()
+        self._seed_memo(training_data)
         self._persist()
         return self._resource
 
@@ -78,15 +93,13 @@ class Speller(GraphComponent, EntityExtractorMixin):
                 if entity_name not in Speller.KEYWORD_ENTITIES:
                     continue
 
-                # Locate a lookup table for this entity type
-                for lookup_dict in self.lookup_tables:
-                    if entity_name == lookup_dict.get('name'):
-                        lookup = lookup_dict.get('elements')
+                # Locate the indexed lookup table for this entity type
+                lookup = self._indexes.get(entity_name)
                 if lookup is None:
                     continue
 
                 # lookup table found, similar search entity value against lookup table
-                new_value, score = self._spell_checker(entity_value, lookup)
+                new_value, score = self._correct(entity_name, entity_value, lookup)
                 if not (score >= SIMILARITY_MIN_SCORE and new_value != entity_value):
                     logger.debug(f"Keep original: '{entity_value}' (score was: {score})")
                     continue
@@ -101,6 +114,46 @@ class Speller(GraphComponent, EntityExtractorMixin):
 
         return messages
 
+    def _build_indexes(self) -> None:
+        """Index each keyword entity lookup table for fuzzy matching"""
+        self._indexes: Dict[Text, TrigramIndex] = {}
+        for lookup_dict in self.lookup_tables:
+            name = lookup_dict.get('name')
+            elements = lookup_dict.get('elements')
+            # elements may still be a file name if the table wasn't loaded
+            if name in Speller.KEYWORD_ENTITIES and isinstance(elements, list):
+                self._indexes[name] = TrigramIndex(elements, candidates=FUZZY_CANDIDATES)
+
+    def _correct(self, entity_name: Text, entity_value: Text, lookup: TrigramIndex) -> Tuple[Text, float]:
+        """_spell_checker through the corrections memo"""
+        key = (entity_name, entity_value)
+        correction = self._memo.get(key)
+        if correction is not None:
+            self._memo.move_to_end(key)
+            return correction
+
+        correction = self._spell_checker(entity_value, lookup)
+        self._memo[key] = correction
+        if len(self._memo) > CORRECTIONS_MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return correction
+
+    def _seed_memo(self, training_data: TrainingData) -> None:
+        """Memoize corrections of the keyword entity values annotated in training examples"""
+        self._memo.clear()
+        for example in training_data.entity_examples:
+            text = example.get(TEXT) or ''
+            for entity in example.get(ENTITIES, []):
+                lookup = self._indexes.get(entity.get('entity'))
+                if lookup is None:
+                    continue
+                # the raw span is what DIET will extract, the value may be a synonym
+                start, end = entity.get('start'), entity.get('end')
+                value = text[start:end] if start is not None and end is not None else entity.get('value')
+                if value:
+                    self._correct(entity['entity'], value, lookup)
+        logger.debug(f'Seeded {len(self._memo)} corrections')
+
     def _persist(self) -> None:
         if self.lookup_tables:
             with self._model_storage.write_to(self._resource) as storage:
@@ -108,6 +161,12 @@ class Speller(GraphComponent, EntityExtractorMixin):
                 write_json_to_file(
                     lookup_tables_file, self.lookup_tables, separators=(",", ": ")
                 )
+                memo_file = storage / Speller.MEMO_FILENAME
+                write_json_to_file(
+                    memo_file,
+                    [[name, value, corrected, score] for (name, value), (corrected, score) in self._memo.items()],
+                    separators=(",", ": "),
+                )
 
     # Adapt to get path from model storage and resource
     @classmethod
@@ -121,9 +180,14 @@ class Speller(GraphComponent, EntityExtractorMixin):
     ) -> GraphComponent:
         """Loads trained component (see parent class for full docstring)."""
         lookup_tables_json = None
+        memo_json = None
         try:
             with model_storage.read_from(resource) as storage:
                 lookup_tables_file = storage / Speller.LOOKUP_TABLES_FILENAME
+                memo_file = storage / Speller.MEMO_FILENAME
+                # optional, models trained before the memo existed don't have it
+                if os.path.isfile(memo_file):
+                    memo_json = read_json_file(memo_file)
 
                 if os.path.isfile(lookup_tables_file):
                     lookup_tables_json = read_json_file(lookup_tables_file)
@@ -138,23 +202,21 @@ class Speller(GraphComponent, EntityExtractorMixin):
                 f"Failed to load {cls.__class__.__name__} from model storage. Resource "
                 f"'{resource.name}' doesn't exist."
             )
-        return cls(config, model_storage, resource, lookup_tables_json)
+        return cls(config, model_storage, resource, lookup_tables_json, memo_json)
 
-    def _spell_checker(self, keyword, predefined_keywords) -> tuple[str, float]:
+    def _spell_checker(self, keyword, predefined_keywords: TrigramIndex) -> tuple[str, float]:
         """
-        Try to match `keyword` and an item in predefined_keywords list, if a good enough
+        Try to match `keyword` and an item in the predefined_keywords index, if a good enough
         match was found, return matched string from predefined_keywords and similarity score.
         If no match was found, return the original keyword.
+        Only the index's trigram shortlist is scored, not the whole lookup table.
 
         i.e
         "sftwar engineer" -> "Software Engineer", 0.77
         or return 0 if no match was found:
         "balblabla" -> "balblabla", 0.0
         """
-        matches = get_close_matches(keyword, predefined_keywords, n=1, cutoff=CLOSEST_MATCH_MIN_SCORE)
-        if matches:
-            closest_match = matches[0]
-            similarity_score = SequenceMatcher(None, keyword, closest_match).ratio()
+        closest_match, similarity_score = predefined_keywords.closest(keyword, CLOSEST_MATCH_MIN_SCORE)
+        if similarity_score:
             logger.debug(f"Best match: {closest_match}, score: {similarity_score}")
-            return closest_match, similarity_score
-        return keyword, 0
+        return closest_match, similarity_score
@@ -0,0 +1,105 @@
+# Speller fuzzy lookup latency vs. lookup table size: difflib.get_close_matches
+# over the whole table (the previous Speller._spell_checker) vs. TrigramIndex.
+# Tables are the job_location lookup from data/nlu.yml padded with synthetic
+# place names, no Rasa needed. Recall is checked on a table padded with
+# combinations of the real names instead, which share many trigrams, with one
+# misspelling per real name. Run from nlu/:
+#   python -m tests.bench_speller [size ...]
+
+import random
+import statistics
+import string
+import sys
+import time
+from difflib import SequenceMatcher, get_close_matches
+
+from custom.fuzzy_index import TrigramIndex
+
+CUTOFF = 0.6
+# misspelled job_location / workplace_type entity values, as DIET extracts them
+QUERIES = ["tel aviv", "tlv", "jerusalm", "hifa", "herzlia", "remot", "hybird", "ramat gn", "bersheva"]
+
+
+def load_locations(path: str = "data/nlu.yml") -> list[str]:
+    """Elements of the job_location lookup table"""
+    locations, in_table = [], False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("- lookup:"):
+                in_table = line.split(":", 1)[1].strip() == "job_location"
+            elif in_table and line.strip().startswith("- "):
+                locations.append(line.strip()[2:].strip())
+    return locations
+
+
+def synthetic_places(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    syllables = ["ka", "ri", "mon", "tel", "shal", "ne", "vor", "ash", "dor", "ya", "kfar", "be"]
+    return [
+        f"{''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize()}"
+        f"{rng.choice(['', ' ' + rng.choice(string.ascii_uppercase) + rng.choice(syllables)])}, Israel"
+        for _ in range(count)
+    ]
+
+
+def combined_places(base: list[str], count: int, seed: int = 0) -> list[str]:
+    """Realistic padding: "<place>, <place> District, Israel" style combinations of real names"""
+    rng = random.Random(seed)
+    patterns = ["{}, {}, Israel", "{}, {} District, Israel", "{} {}", "{}, {}"]
+    return [rng.choice(patterns).format(rng.choice(base), rng.choice(base)) for _ in range(count)]
+
+
+def misspell(word: str, seed: int) -> str:
+    """`word` lowercased with one letter replaced"""
+    rng = random.Random(seed)
+    word = word.lower()
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice(string.ascii_lowercase.replace(word[position], "")) + word[position + 1:]
+
+
+def difflib_closest(keyword: str, elements: list[str]) -> tuple[str, float]:
+    matches = get_close_matches(keyword, elements, n=1, cutoff=CUTOFF)
+    if matches:
+        return matches[0], SequenceMatcher(None, keyword, matches[0]).ratio()
+    return keyword, 0
+
+
+def per_message_ms(fn, runs: int = 5) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for query in QUERIES:
+            fn(query)
+        timings.append((time.perf_counter() - start) / len(QUERIES))
+    return statistics.median(timings) * 1000
+
+
+def main(sizes: list[int]):
+    base = load_locations()
+    for size in sizes:
+        elements = base + synthetic_places(max(0, size - len(base)))
+        start = time.perf_counter()
+        index = TrigramIndex(elements)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        agree = sum(
+            difflib_closest(query, elements)[0] == index.closest(query, CUTOFF)[0] for query in QUERIES
+        )
+        scan = per_message_ms(lambda query: difflib_closest(query, elements))
+        indexed = per_message_ms(lambda query: index.closest(query, CUTOFF))
+        print(f"{len(elements):>7} elements: difflib {scan:9.3f} ms | index {indexed:7.3f} ms"
+              f" | build {build_ms:8.1f} ms | same match {agree}/{len(QUERIES)}")
+
+    # recall: the index may pick another match, but never a worse scoring one
+    elements = base + combined_places(base, 10_000)
+    index = TrigramIndex(elements)
+    queries = ["gilat"] + [misspell(place, seed) for seed, place in enumerate(base)]
+    worse = [
+        query for query in queries
+        if index.closest(query, CUTOFF)[1] < difflib_closest(query, elements)[1]
+    ]
+    print(f"{len(elements):>7} combined elements: worse match on {len(worse)}/{len(queries)} queries {worse}")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [100, 1_000, 10_000, 50_000])